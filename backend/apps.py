@@ -3,6 +3,7 @@ import logging
 from django.apps import AppConfig
 from django.db.models import Q
 from django.db import connection
+from django.utils import timezone
 
 
 logger = logging.getLogger(__name__)
@@ -29,19 +30,28 @@ class BackendConfig(AppConfig):
         if scheduled is None or active is None or reserved is None:
             return
 
+        # only run_plugin and poll_plugin_run get the plugin run arguments
         celery_runs = [
             run['args'][0]['plugin_run']
             for category in (list(scheduled.values()) +
                              list(active.values()) +
                              list(reserved.values()))
             for run in category
+            if run['args'] and isinstance(run['args'][0], dict)
         ]
 
+        # queued runs that were not dispatched yet are still waiting in the scheduler,
+        # waiting ones that were not dispatched wait for upload_video of their batch
         open_runs = PluginRun.objects.exclude(Q(status=PluginRun.STATUS_DONE)|
                                               Q(status=PluginRun.STATUS_ERROR)|
-                                              Q(id__in=celery_runs))
+                                              Q(status=PluginRun.STATUS_CANCELED)|
+                                              Q(id__in=celery_runs)|
+                                              Q(status=PluginRun.STATUS_QUEUED,
+                                                dispatched=False)|
+                                              Q(status=PluginRun.STATUS_WAITING,
+                                                dispatched=False))
         if len(open_runs) > 0:
             logger.warning(
                 f'Setting the status of {len(open_runs)} non-running PluginRuns to UNKNOWN'
             )
-            open_runs.update(status=PluginRun.STATUS_UNKNOWN)
+            open_runs.update(status=PluginRun.STATUS_UNKNOWN, update_date=timezone.now())
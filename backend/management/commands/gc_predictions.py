@@ -0,0 +1,231 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from backend.models import (
+    AnalyserResultCache,
+    AnalyserUpload,
+    ClusterItem,
+    PluginRunResult,
+    PluginRunStage,
+)
+from analyser.data import DataManager
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def entry_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+def data_id_from_name(name):
+    return name.split(".")[0]
+
+
+def image_ids(root, data_id):
+    """
+    Ids of the image files of an images data package, which are stored next to it.
+    """
+    data = DataManager(root).load(data_id)
+    if data is None:
+        return []
+    try:
+        with data:
+            data.load()
+        images = data.images
+    except AttributeError:
+        return []
+    return [x.id for x in images]
+
+
+class Command(BaseCommand):
+    help = "Removes data and thumbnails in the prediction store that no result refers to"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=settings.DATA_OUTPUT_PATH, type=str)
+        parser.add_argument("--dry_run", action="store_true")
+        parser.add_argument("--workers", default=8, type=int)
+        parser.add_argument(
+            "--min_age", default=24, type=float, help="hours since the last change"
+        )
+        parser.add_argument(
+            "--rate", default=50, type=float, help="deletions per second, 0 is unlimited"
+        )
+        parser.add_argument(
+            "--ignore_unreadable",
+            action="store_true",
+            help="remove orphans even if images data packages couldn't be read, their "
+            "images are removed as well",
+        )
+
+    def referenced_ids(self, root, workers):
+        references = self.direct_references()
+
+        # outputs of finished stages are reused by later and resumed plugin runs
+        packages = set()
+        for model in (AnalyserResultCache, PluginRunStage):
+            for outputs in model.objects.values_list("outputs", flat=True):
+                packages.update(x for x in (outputs or {}).values() if x)
+
+        packages.update(
+            PluginRunResult.objects.filter(type=PluginRunResult.TYPE_IMAGES)
+            .exclude(data_id=None)
+            .values_list("data_id", flat=True)
+        )
+
+        # image files are only known to the package that contains them, a package that
+        # can't be read stays referenced but its images are unknown
+        failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {x: executor.submit(image_ids, root, x) for x in packages}
+            for data_id, future in futures.items():
+                try:
+                    references.update(future.result())
+                except Exception:
+                    logger.exception(f"Reading images data {data_id} failed")
+                    references.add(data_id)
+                    failed += 1
+        return references, failed
+
+    def direct_references(self):
+        references = set()
+        references.update(
+            PluginRunResult.objects.exclude(data_id=None).values_list(
+                "data_id", flat=True
+            )
+        )
+        for image_path in ClusterItem.objects.exclude(image_path=None).values_list(
+            "image_path", flat=True
+        ):
+            references.add(data_id_from_name(image_path.split("/")[-1]))
+        for model in (AnalyserResultCache, PluginRunStage):
+            for outputs in model.objects.values_list("outputs", flat=True):
+                references.update(x for x in (outputs or {}).values() if x)
+        # uploaded videos are reused by later plugin runs of the same content
+        references.update(AnalyserUpload.objects.values_list("data_id", flat=True))
+        return references
+
+    def scan_shard(self, shard_path, references, min_mtime):
+        orphans = []
+        with os.scandir(shard_path) as sub_dirs:
+            for sub_dir in sub_dirs:
+                if not sub_dir.is_dir():
+                    continue
+                with os.scandir(sub_dir.path) as entries:
+                    for entry in entries:
+                        data_id = data_id_from_name(entry.name)
+                        # only entries in the <id[0:2]>/<id[2:4]>/ layout of the store
+                        if data_id[0:2] != os.path.basename(shard_path):
+                            continue
+                        if data_id[2:4] != sub_dir.name:
+                            continue
+                        if data_id in references:
+                            continue
+                        try:
+                            if entry.stat().st_mtime > min_mtime:
+                                continue
+                            orphans.append((entry.path, entry_size(entry.path)))
+                        except FileNotFoundError:
+                            continue
+        return orphans
+
+    def handle(self, *args, **options):
+        root = options["path"]
+        workers = max(1, options["workers"])
+        min_mtime = time.time() - options["min_age"] * 60 * 60
+
+        references, failed = self.referenced_ids(root, workers)
+        self.stdout.write(f"{len(references)} referenced data ids")
+        if failed:
+            self.stdout.write(
+                self.style.WARNING(f"{failed} images data packages couldn't be read")
+            )
+            if not options["ignore_unreadable"] and not options["dry_run"]:
+                # a read error may be transient, their images would be lost for good
+                self.stdout.write(
+                    self.style.ERROR(
+                        "Nothing removed, rerun later or pass --ignore_unreadable"
+                    )
+                )
+                return
+
+        shards = []
+        with os.scandir(root) as it:
+            shards = [x.path for x in it if x.is_dir() and len(x.name) == 2]
+
+        orphans = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(
+                lambda x: self.scan_shard(x, references, min_mtime), shards
+            ):
+                orphans.extend(result)
+
+        size = sum(x[1] for x in orphans)
+        self.stdout.write(f"{len(orphans)} orphans, {size} bytes")
+
+        if options["dry_run"]:
+            for path, _ in orphans:
+                self.stdout.write(path)
+            return
+
+        # results created while scanning may refer to data that looked unused
+        references = self.direct_references()
+        orphans = [
+            x
+            for x in orphans
+            if data_id_from_name(os.path.basename(x[0])) not in references
+        ]
+
+        limiter = RateLimiter(options["rate"])
+
+        def remove(orphan):
+            path, size = orphan
+            limiter.wait()
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+                return size
+            except FileNotFoundError:
+                return None
+            except OSError:
+                logger.exception(f"Removing {path} failed")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            freed = [x for x in executor.map(remove, orphans) if x is not None]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Removed {len(freed)} orphans ({sum(freed)} bytes)")
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from backend.utils.result_cache import cache_entries, cache_stats, evict
+
+
+class Command(BaseCommand):
+    help = "Shows the size and counters of the result cache and evicts old entries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--evict", action="store_true")
+        parser.add_argument(
+            "--max_size", type=int, help="bytes, defaults to DATA_CACHE_MAX_SIZE"
+        )
+
+    def handle(self, *args, **options):
+        if options["evict"]:
+            max_size = options["max_size"]
+            if max_size is None:
+                max_size = settings.DATA_CACHE_MAX_SIZE
+            result = evict(max_size)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Removed {result['removed']} results ({result['freed']} bytes)"
+                )
+            )
+
+        entries = cache_entries()
+        size = sum(x["size"] for x in entries)
+        self.stdout.write(f"{len(entries)} results, {size} bytes")
+        for name, value in cache_stats().items():
+            self.stdout.write(f"{name}: {value}")
@@ -2,9 +2,8 @@ import os
 import json
 from django.core.management.base import BaseCommand, CommandError
 from backend.models import Video
+from backend.utils.media import create_uploaded_video
 import pathlib
-import imageio
-import shutil
 import uuid
 from django.contrib import auth
 from django.conf import settings
@@ -40,31 +39,20 @@ class Command(BaseCommand):
                     elif options["name"] == "filename":
                         video_name = path.stem
 
-                    reader = imageio.get_reader(file_path)
-                    fps = reader.get_meta_data()["fps"]
-                    duration = reader.get_meta_data()["duration"]
-                    size = reader.get_meta_data()["size"]
-
                     ext = path.suffix
 
                     video_id_uuid = uuid.uuid4()
-                    video_id = video_id_uuid.hex
-
-                    output_dir = os.path.join(settings.MEDIA_ROOT)
-                    shutil.copyfile(file_path, os.path.join(output_dir, f"{video_id}{ext}"))
 
-                    video_db, created = Video.objects.get_or_create(
+                    # the file is only copied if its content is not stored yet
+                    video_db = create_uploaded_video(
+                        file_path,
+                        video_id_uuid,
                         name=video_name,
-                        id=video_id_uuid,
                         ext=ext,
-                        fps=fps,
-                        duration=duration,
-                        width=size[0],
-                        height=size[1],
-                        owner=user,
+                        user=user,
                     )
 
-                    print(video_id_uuid.hex)
+                    print(video_id_uuid.hex, video_db.file.hex)
 
         self.stdout.write(self.style.SUCCESS(f"Videos added"))
         # else:
@@ -1,4 +1,5 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 class TibavaUserManager(BaseUserManager):
@@ -7,4 +8,12 @@ class TibavaUserManager(BaseUserManager):
         user = self.model(username=username, email=email)
         user.set_password(password)
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+class SoftDeleteManager(models.Manager):
+    """
+    Hides rows that are marked as deleted, backend.tasks.deletion removes them later.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted=False)
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0022_auto_20240507_0815'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='file_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.CreateModel(
+            name='AnalyserUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_hash', models.CharField(max_length=64)),
+                ('host', models.CharField(max_length=256)),
+                ('port', models.CharField(max_length=16)),
+                ('data_id', models.CharField(max_length=64)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('last_used', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('file_hash', 'host', 'port')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:03
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0023_analyserupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyserResultCache',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('analyser', models.CharField(max_length=256)),
+                ('host', models.CharField(max_length=256)),
+                ('port', models.CharField(max_length=16)),
+                ('outputs', models.JSONField(default=dict)),
+                ('hits', models.IntegerField(default=0)),
+                ('date', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('last_used', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.1 on 2026-10-18 11:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0024_analyserresultcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PluginRunStage',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=256)),
+                ('analyser', models.CharField(max_length=256)),
+                ('job_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('parameters', models.JSONField(default=dict)),
+                ('inputs', models.JSONField(default=dict)),
+                ('outputs', models.JSONField(default=dict)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('update_date', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('U', 'UNKNOWN'), ('E', 'ERROR'), ('D', 'DONE'), ('R', 'RUNNING'), ('Q', 'QUEUED'), ('W', 'WAITING')], default='Q', max_length=2)),
+                ('plugin_run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stages', to='backend.pluginrun')),
+            ],
+            options={
+                'unique_together': {('plugin_run', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.1.1 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0025_pluginrunstage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pluginrun',
+            name='dispatched',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='pluginrun',
+            name='priority',
+            field=models.IntegerField(default=5),
+        ),
+        migrations.AddField(
+            model_name='pluginrun',
+            name='queue_position',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pluginrun',
+            name='task_args',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
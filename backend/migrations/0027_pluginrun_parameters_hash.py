@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0026_auto_20261018_1340'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pluginrun',
+            name='parameters_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.1 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0027_pluginrun_parameters_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pluginrun',
+            name='celery_task_id',
+            field=models.CharField(blank=True, max_length=256, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pluginrun',
+            name='status',
+            field=models.CharField(choices=[('U', 'UNKNOWN'), ('E', 'ERROR'), ('D', 'DONE'), ('R', 'RUNNING'), ('Q', 'QUEUED'), ('W', 'WAITING'), ('C', 'CANCELED')], default='U', max_length=2),
+        ),
+        migrations.AlterField(
+            model_name='pluginrunstage',
+            name='status',
+            field=models.CharField(choices=[('U', 'UNKNOWN'), ('E', 'ERROR'), ('D', 'DONE'), ('R', 'RUNNING'), ('Q', 'QUEUED'), ('W', 'WAITING'), ('C', 'CANCELED')], default='Q', max_length=2),
+        ),
+    ]
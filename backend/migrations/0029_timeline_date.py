@@ -0,0 +1,20 @@
+# Generated by Django 3.1.1 on 2026-10-18 15:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0028_auto_20261018_1502'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeline',
+            name='date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.1.1 on 2026-10-18 16:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('backend', '0029_timeline_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoUploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=256)),
+                ('ext', models.CharField(max_length=256)),
+                ('size', models.BigIntegerField()),
+                ('chunk_size', models.IntegerField()),
+                ('analyser', models.CharField(blank=True, default='', max_length=1024)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('update_date', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VideoUploadChunk',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('index', models.IntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='backend.videouploadsession')),
+            ],
+            options={
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.1 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0030_videouploadsession_videouploadchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pluginrun',
+            name='deleted',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='deleted',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0031_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pluginrun',
+            name='update_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
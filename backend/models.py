@@ -7,12 +7,14 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models.signals import post_delete
+from django.utils import timezone
 from django.dispatch import receiver
 from backend.utils.color import rgb_to_hex, random_rgb
 
 from analyser.data import DataManager
 from backend.utils import media_path_to_video
-from .managers import TibavaUserManager
+from backend.utils.deletion import remove_plugin_run_result_files
+from .managers import SoftDeleteManager, TibavaUserManager
 
 
 logger = logging.getLogger(__name__)
@@ -53,6 +55,13 @@ class Video(models.Model):
     duration = models.FloatField(blank=True, null=True)
     height = models.IntegerField(blank=True, null=True)
     width = models.IntegerField(blank=True, null=True)
+    # sha256 of the stored media file, filled lazily
+    file_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    # marked videos are hidden and removed by backend.tasks.deletion
+    deleted = models.BooleanField(default=False, db_index=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
 
     def to_dict(self, include_refs_hashes=True, include_refs=False, **kwargs):
         return {
@@ -87,11 +96,71 @@ class Video(models.Model):
 @receiver(post_delete, sender=Video)
 def delete_video_file(sender, instance, **kwargs):
     logger.info(f"Deleting video {instance.id.hex} by user {instance.owner.username}")
-    path = media_path_to_video(instance.id.hex, instance.ext)
+    file_id = instance.file if instance.file else instance.id
+    # the media file can be shared by videos with the same content
+    if Video.objects.filter(file=file_id).exists():
+        return
+    path = media_path_to_video(file_id.hex, instance.ext)
     if os.path.exists(path):
         os.remove(path)
 
 
+class AnalyserUpload(models.Model):
+    """
+    Maps the content of a media file to the data id it got on an analyser instance,
+    so that the same video doesn't have to be uploaded for every plugin run.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_hash = models.CharField(max_length=64)
+    host = models.CharField(max_length=256)
+    port = models.CharField(max_length=16)
+    data_id = models.CharField(max_length=64)
+    date = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("file_hash", "host", "port")
+
+    def to_dict(self, **kwargs):
+        return {
+            "id": self.id.hex,
+            "file_hash": self.file_hash,
+            "host": self.host,
+            "port": self.port,
+            "data_id": self.data_id,
+            "date": self.date,
+            "last_used": self.last_used,
+        }
+
+
+class AnalyserResultCache(models.Model):
+    """
+    Output data ids of a finished analyser job, keyed by analyser name, inputs and
+    parameters, so that identical stages of later plugin runs can be skipped.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    key = models.CharField(max_length=64, unique=True)
+    analyser = models.CharField(max_length=256)
+    host = models.CharField(max_length=256)
+    port = models.CharField(max_length=16)
+    outputs = models.JSONField(default=dict)
+    hits = models.IntegerField(default=0)
+    date = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used = models.DateTimeField(auto_now=True, db_index=True)
+
+    def to_dict(self, **kwargs):
+        return {
+            "id": self.id.hex,
+            "analyser": self.analyser,
+            "outputs": self.outputs,
+            "hits": self.hits,
+            "date": self.date,
+            "last_used": self.last_used,
+        }
+
+
 class Plugin(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -102,14 +171,82 @@ class Plugin(models.Model):
         return result
 
 
+class VideoUploadSession(models.Model):
+    # the id of the video that is created when the upload is complete
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    name = models.CharField(max_length=256)
+    ext = models.CharField(max_length=256)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    analyser = models.CharField(max_length=1024, blank=True, default="")
+    date = models.DateTimeField(auto_now_add=True)
+    update_date = models.DateTimeField(auto_now=True)
+
+    @property
+    def num_chunks(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    @property
+    def path(self):
+        return media_path_to_video(self.id.hex, self.ext) + ".part"
+
+    def to_dict(self, **kwargs):
+        return {
+            "id": self.id.hex,
+            "name": self.name,
+            "ext": self.ext,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "num_chunks": self.num_chunks,
+            "received": sorted(self.chunks.values_list("index", flat=True)),
+        }
+
+
+class VideoUploadChunk(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(
+        VideoUploadSession, on_delete=models.CASCADE, related_name="chunks"
+    )
+    index = models.IntegerField()
+    checksum = models.CharField(max_length=64)
+    date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("session", "index")
+
+
+@receiver(post_delete, sender=VideoUploadSession)
+def delete_video_upload_file(sender, instance, **kwargs):
+    if os.path.exists(instance.path):
+        os.remove(instance.path)
+
+
 class PluginRun(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     video = models.ForeignKey(Video, on_delete=models.CASCADE)
     date = models.DateTimeField(auto_now_add=True)
-    update_date = models.DateTimeField(auto_now_add=True)
+    update_date = models.DateTimeField(auto_now_add=True, db_index=True)
     type = models.CharField(max_length=256)
     progress = models.FloatField(default=0.0)
     in_scheduler = models.BooleanField(default=False)
+    # handed over to celery by schedule_plugin_runs
+    dispatched = models.BooleanField(default=False, db_index=True)
+    priority = models.IntegerField(default=5)
+    queue_position = models.IntegerField(blank=True, null=True)
+    task_args = models.JSONField(blank=True, null=True)
+    # identifies identical submissions of a plugin for a video
+    parameters_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    # last celery task that works on this run, revoked on cancel
+    celery_task_id = models.CharField(max_length=256, blank=True, null=True)
+    # marked runs are hidden and removed by backend.tasks.deletion
+    deleted = models.BooleanField(default=False, db_index=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
 
     STATUS_UNKNOWN = "U"
     STATUS_ERROR = "E"
@@ -117,6 +254,7 @@ class PluginRun(models.Model):
     STATUS_RUNNING = "R"
     STATUS_QUEUED = "Q"
     STATUS_WAITING = "W"
+    STATUS_CANCELED = "C"
     STATUS = {
         STATUS_UNKNOWN: "UNKNOWN",
         STATUS_ERROR: "ERROR",
@@ -124,6 +262,7 @@ class PluginRun(models.Model):
         STATUS_RUNNING: "RUNNING",
         STATUS_QUEUED: "QUEUED",
         STATUS_WAITING: "WAITING",
+        STATUS_CANCELED: "CANCELED",
     }
 
     status = models.CharField(
@@ -140,11 +279,113 @@ class PluginRun(models.Model):
             "update_date": self.update_date,
             "progress": self.progress,
             "status": self.STATUS[self.status],
+            "priority": self.priority,
+            "queue_position": self.queue_position,
         }
         if include_refs_hashes:
             result["video_id"] = self.video.id.hex
         return result
 
+    def set_progress(self, progress: float, force: bool = False):
+        """
+        Writes only the progress. Updates within PLUGIN_RUN_PROGRESS_INTERVAL seconds
+        of the last write are kept in memory and written with the next one.
+        """
+        self.progress = progress
+        written = getattr(self, "_progress_written", None)
+        if written is not None and written[0] == progress:
+            return
+
+        now = timezone.now()
+        interval = getattr(settings, "PLUGIN_RUN_PROGRESS_INTERVAL", 0)
+        if (
+            not force
+            and written is not None
+            and (now - written[1]).total_seconds() < interval
+        ):
+            return
+
+        self.update_date = now
+        self.save(update_fields=["progress", "update_date"])
+        self._progress_written = (progress, now)
+
+    def set_status(self, status: str, progress: float = None):
+        """
+        Writes the status together with a pending progress, unchanged values are not
+        written. A canceled run keeps its status.
+        """
+        if progress is not None:
+            self.progress = progress
+
+        fields = {}
+        if status != self.status:
+            fields["status"] = status
+        written = getattr(self, "_progress_written", None)
+        if written is None or written[0] != self.progress:
+            fields["progress"] = self.progress
+        if not fields:
+            return
+
+        now = timezone.now()
+        fields["update_date"] = now
+        updated = (
+            PluginRun.objects.filter(id=self.id)
+            .exclude(status=PluginRun.STATUS_CANCELED)
+            .update(**fields)
+        )
+        if not updated:
+            self.status = PluginRun.STATUS_CANCELED
+            return
+
+        self.status = status
+        self.update_date = now
+        self._progress_written = (self.progress, now)
+
+
+class PluginRunStage(models.Model):
+    """
+    A single analyser job started by a plugin run. The key is the analyser name
+    plus its call index inside the plugin, so replays of a plugin find their stages.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    plugin_run = models.ForeignKey(
+        PluginRun, on_delete=models.CASCADE, related_name="stages"
+    )
+    key = models.CharField(max_length=256)
+    analyser = models.CharField(max_length=256)
+    job_id = models.CharField(max_length=64, null=True, blank=True)
+    parameters = models.JSONField(default=dict)
+    inputs = models.JSONField(default=dict)
+    outputs = models.JSONField(default=dict)
+    date = models.DateTimeField(auto_now_add=True)
+    update_date = models.DateTimeField(auto_now=True)
+
+    status = models.CharField(
+        max_length=2,
+        choices=[(k, v) for k, v in PluginRun.STATUS.items()],
+        default=PluginRun.STATUS_QUEUED,
+    )
+
+    class Meta:
+        unique_together = ("plugin_run", "key")
+
+    def to_dict(self, include_refs_hashes=True, include_refs=False, **kwargs):
+        result = {
+            "id": self.id.hex,
+            "key": self.key,
+            "analyser": self.analyser,
+            "job_id": self.job_id,
+            "parameters": self.parameters,
+            "outputs": self.outputs,
+            "date": self.date,
+            "update_date": self.update_date,
+            "status": PluginRun.STATUS[self.status],
+        }
+        if include_refs_hashes:
+            result["plugin_run_id"] = self.plugin_run.id.hex
+        return result
+
 
 class PluginRunResult(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -196,29 +437,16 @@ def delete_pluginresult_data(sender, instance, **kwargs):
     logger.info(
         f"Deleting PluginRunResult {instance.id} by user {instance.plugin_run.video.owner.username}"
     )
-    data_manager = DataManager("/predictions/")
+    # the files of deleted plugin runs and videos are removed by purge_deleted
+    if instance.plugin_run.deleted or instance.plugin_run.video.deleted:
+        return
 
-    if instance.type == PluginRunResult.TYPE_IMAGES:
-        data = data_manager.load(instance.data_id)
-        try:
-            with data:
-                data.load()
-            images = data.images
-        except AttributeError:
-            images = []
-        for image in images:
-            path = data_manager._create_file_path(image.id, image.ext)
-            if os.path.exists(path):
-                os.remove(path)
-
-    for clusteritem in instance.cluster_items.all():
-        filename, ext = clusteritem.image_path.split("/")[-1].split(".")
-
-        path = data_manager._create_file_path(filename, ext)
-        if os.path.exists(path):
-            os.remove(path)
-
-    data_manager.delete(instance.data_id)
+    data_manager = DataManager("/predictions/")
+    remove_plugin_run_result_files(
+        data_manager,
+        instance,
+        [x.image_path for x in instance.cluster_items.all()],
+    )
 
 
 class Timeline(models.Model):
@@ -228,6 +456,7 @@ class Timeline(models.Model):
         PluginRunResult, on_delete=models.CASCADE, null=True, blank=True
     )
     name = models.CharField(max_length=256)
+    date = models.DateTimeField(auto_now_add=True, db_index=True)
 
     TYPE_ANNOTATION = "A"
     TYPE_PLUGIN_RESULT = "R"
@@ -3,11 +3,27 @@ import traceback
 import sys
 import os
 import json
-from typing import List
-
-from celery import shared_task
-from backend.models import PluginRun, Video, TibavaUser, PluginRunResult
+import hashlib
+from collections import Counter
+from datetime import timedelta
+from functools import partial
+from typing import Dict, List
+
+from celery import shared_task, chain, group
+from backend.models import PluginRun, PluginRunStage, Video, TibavaUser, PluginRunResult
+from backend.utils.analyser_client import (
+    PluginRunCanceled,
+    TaskAnalyserClient,
+    analyser_status_to_task_status,
+)
+from backend.utils.analyser_cache import normalize_parameter
+from backend.utils.result_arrays import write_result_arrays
+from backend.utils.result_cache import array_cache_dir, json_cache_path, write_result
+from backend.utils.task import AnalyserJobPending, Task
 from analyser.data import DataManager
+from analyser.proto import analyser_pb2
+from django.db import connection, transaction
+from django.utils import timezone
 
 from django.conf import settings
 
@@ -64,31 +80,55 @@ class PluginManager:
             f'User "{user.username}" has started plugin "{plugin}" with parameters {parameters}'
         )
 
-        if plugin in self._parser:
-            parameters = self._parser[plugin]()(parameters)
-        else:
-            parameters = {}
+        parameters = self.parse_parameters(plugin, parameters)
 
         result = {"status": True}
         plugin_run = None
         if not dry_run:
-            plugin_run = PluginRun.objects.create(
-                video=video, type=plugin, status=PluginRun.STATUS_QUEUED
+            plugin_run = PluginRun(
+                video=video,
+                type=plugin,
+                status=PluginRun.STATUS_QUEUED,
+                priority=plugin_priority(plugin),
+                dispatched=not run_async,
+                parameters_hash=plugin_parameters_hash(parameters, kwargs),
             )
+        args = {
+            "plugin": plugin,
+            "parameters": parameters,
+            "video": video.id.hex,
+            "user": user.id,
+            "plugin_run": plugin_run.id.hex if plugin_run else None,
+            "dry_run": dry_run,
+            "kwargs": kwargs,
+        }
+        if plugin_run is not None:
+            if run_async:
+                plugin_run.task_args = args
+                with transaction.atomic():
+                    in_flight = lock_in_flight_plugin_runs([video], [plugin])
+                    duplicate = in_flight.get(
+                        (video.id, plugin, plugin_run.parameters_hash)
+                    )
+                    if duplicate is not None:
+                        logger.info(
+                            f"Plugin {plugin} is already running for video {video.id} as {duplicate.id}"
+                        )
+                        return {
+                            "status": True,
+                            "plugin_run": duplicate.id.hex,
+                            "duplicate": True,
+                        }
+                    plugin_run.save()
+            else:
+                plugin_run.save()
+            result["plugin_run"] = plugin_run.id.hex
+
         if run_async:
-            run_plugin.apply_async(
-                (
-                    {
-                        "plugin": plugin,
-                        "parameters": parameters,
-                        "video": video.id,
-                        "user": user.id,
-                        "plugin_run": plugin_run.id if plugin_run else None,
-                        "dry_run": dry_run,
-                        "kwargs": kwargs,
-                    },
-                )
-            )
+            if plugin_run is None:
+                run_plugin.apply_async((args,))
+            else:
+                schedule_plugin_runs.delay()
         else:
             try:
                 plugin_result = self._plugins[plugin]()(
@@ -100,9 +140,7 @@ class PluginManager:
                     **kwargs,
                 )
                 if plugin_run is not None:
-                    plugin_run.progress = 1.0
-                    plugin_run.status = PluginRun.STATUS_DONE
-                    plugin_run.save()
+                    plugin_run.set_status(PluginRun.STATUS_DONE, progress=1.0)
 
                 # Create cache files for all plugin run results.
                 manager = DataManager("/predictions/")
@@ -113,16 +151,201 @@ class PluginManager:
                 if plugin_result:
                     result["result"] = plugin_result
 
+            except PluginRunCanceled:
+                logger.info(f"Plugin {plugin} was canceled")
+                result["status"] = False
+                return result
+
             except Exception:
                 logger.exception(f"Failed to run plugin {plugin_run.type}")
 
                 if plugin_run is not None:
-                    plugin_run.status = PluginRun.STATUS_ERROR
-                    plugin_run.save()
+                    plugin_run.set_status(PluginRun.STATUS_ERROR)
                 result["status"] = False
                 return result
         return result
 
+    def parse_parameters(self, plugin: str, parameters: List = None):
+        if plugin in self._parser:
+            return self._parser[plugin]()(parameters)
+        return {}
+
+    def submit_batch(
+        self,
+        videos: List[Video],
+        plugins: List[Dict],
+        user: TibavaUser,
+        dry_run: bool = False,
+        **kwargs,
+    ):
+        """
+        Starts every plugin for every video. plugins is a list of
+        {"plugin": name, "parameters": [...]} entries. All parameters are validated
+        before anything is created, the video is uploaded to the analyser once per
+        video before its plugins start. Runs that are identical to one that is still
+        queued or running are not created again, the existing run is returned instead.
+        """
+        parsed_plugins = []
+        for entry in plugins:
+            plugin = entry.get("plugin")
+            if plugin not in self._plugins:
+                logger.error(f"Unknown plugin {plugin}")
+                return {"status": False, "type": "not_exist", "plugin": plugin}
+
+            parameters = self.parse_parameters(plugin, entry.get("parameters", []))
+            if parameters is None:
+                return {"status": False, "type": "wrong_parameters", "plugin": plugin}
+            parsed_plugins.append((plugin, parameters))
+
+        logger.info(
+            f'User "{user.username}" has started {len(parsed_plugins)} plugins for {len(videos)} videos'
+        )
+
+        plugin_runs_db = []
+        for video in videos:
+            for plugin, parameters in parsed_plugins:
+                # waiting for the upload, the scheduler only takes queued runs
+                plugin_run_db = PluginRun(
+                    video=video,
+                    type=plugin,
+                    status=PluginRun.STATUS_WAITING,
+                    priority=plugin_priority(plugin),
+                    parameters_hash=plugin_parameters_hash(parameters, kwargs),
+                )
+                plugin_run_db.task_args = {
+                    "plugin": plugin,
+                    "parameters": parameters,
+                    "video": video.id.hex,
+                    "user": user.id,
+                    "plugin_run": None if dry_run else plugin_run_db.id.hex,
+                    "dry_run": dry_run,
+                    "kwargs": kwargs,
+                }
+                plugin_runs_db.append(plugin_run_db)
+
+        if dry_run:
+            plugin_runs_iter = iter(plugin_runs_db)
+            group(
+                chain(
+                    upload_video.si(video.id.hex),
+                    group(
+                        [
+                            run_plugin.si(next(plugin_runs_iter).task_args)
+                            for _ in parsed_plugins
+                        ]
+                    ),
+                )
+                for video in videos
+            ).apply_async()
+            return {"status": True, "plugin_runs": []}
+
+        with transaction.atomic():
+            in_flight = lock_in_flight_plugin_runs(
+                videos, [plugin for plugin, _ in parsed_plugins]
+            )
+            result_runs = []
+            new_runs = []
+            for plugin_run_db in plugin_runs_db:
+                key = (
+                    plugin_run_db.video_id,
+                    plugin_run_db.type,
+                    plugin_run_db.parameters_hash,
+                )
+                if key not in in_flight:
+                    in_flight[key] = plugin_run_db
+                    new_runs.append(plugin_run_db)
+                result_runs.append(in_flight[key])
+
+            PluginRun.objects.bulk_create(new_runs)
+
+        if len(new_runs) < len(plugin_runs_db):
+            logger.info(
+                f"{len(plugin_runs_db) - len(new_runs)} plugin runs are already queued or running"
+            )
+
+        # the runs are queued and scheduled once their video is uploaded
+        group(
+            chain(
+                upload_video.si(
+                    video.id.hex,
+                    [x.id.hex for x in new_runs if x.video_id == video.id],
+                ),
+                schedule_plugin_runs.si(),
+            )
+            for video in videos
+        ).apply_async()
+
+        return {
+            "status": True,
+            "plugin_runs": [x.id.hex for x in result_runs],
+        }
+
+    def cancel(self, plugin_runs: List[PluginRun]) -> List[str]:
+        """
+        Cancels queued and running plugin runs. Their celery tasks are revoked, a task
+        that is already executing notices the new status the next time it talks to the
+        analyser and stops without downloading outputs. Returns the canceled ids.
+        """
+        canceled = []
+        for plugin_run in plugin_runs:
+            # only the request that changes the status revokes the task
+            updated = PluginRun.objects.filter(
+                id=plugin_run.id, status__in=IN_FLIGHT_STATUS
+            ).update(
+                status=PluginRun.STATUS_CANCELED,
+                queue_position=None,
+                update_date=timezone.now(),
+            )
+            if not updated:
+                continue
+            plugin_run.refresh_from_db()
+
+            PluginRunStage.objects.filter(plugin_run=plugin_run).exclude(
+                status=PluginRun.STATUS_DONE
+            ).update(status=PluginRun.STATUS_CANCELED)
+
+            if plugin_run.celery_task_id:
+                run_plugin.app.control.revoke(plugin_run.celery_task_id)
+            canceled.append(plugin_run.id.hex)
+
+        if canceled:
+            logger.info(f"Canceled plugin runs {canceled}")
+            # the freed slots go to the next queued runs
+            schedule_plugin_runs.delay()
+        return canceled
+
+    def resume(self, plugin_runs: List[PluginRun]) -> List[str]:
+        """
+        Queues failed, canceled or interrupted plugin runs again. Finished stages of the
+        earlier attempt are reused as long as their outputs still exist, see
+        Task.stage_reusable. Returns the ids of the resumed runs.
+        """
+        resumed = []
+        for plugin_run in plugin_runs:
+            # runs started synchronously have no arguments to start them again
+            updated = (
+                PluginRun.objects.filter(
+                    id=plugin_run.id,
+                    status__in=RESUMABLE_STATUS,
+                    task_args__isnull=False,
+                )
+                .update(
+                    status=PluginRun.STATUS_QUEUED,
+                    dispatched=False,
+                    in_scheduler=False,
+                    queue_position=None,
+                    update_date=timezone.now(),
+                )
+            )
+            if not updated:
+                continue
+            resumed.append(plugin_run.id.hex)
+
+        if resumed:
+            logger.info(f"Resumed plugin runs {resumed}")
+            schedule_plugin_runs.delay()
+        return resumed
+
     def get_results(self, analyse):
         if not hasattr(analyse, "type"):
             return None
@@ -134,23 +357,119 @@ class PluginManager:
         return analyser.get_results(analyse)
 
 
+IN_FLIGHT_STATUS = (
+    PluginRun.STATUS_QUEUED,
+    PluginRun.STATUS_WAITING,
+    PluginRun.STATUS_RUNNING,
+)
+
+
+RESUMABLE_STATUS = (
+    PluginRun.STATUS_ERROR,
+    PluginRun.STATUS_UNKNOWN,
+    PluginRun.STATUS_CANCELED,
+)
+
+
+def plugin_parameters_hash(parameters: Dict, kwargs: Dict = None) -> str:
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "parameters": normalize_parameter(parameters),
+                "kwargs": normalize_parameter(kwargs if kwargs else {}),
+            },
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def lock_in_flight_plugin_runs(videos: List[Video], plugins: List[str]) -> Dict:
+    """
+    Returns the queued and running plugin runs of the videos keyed by
+    (video id, plugin, parameters hash). Has to be called inside a transaction, the
+    video rows stay locked until it ends so identical submissions can't race.
+    """
+    video_ids = sorted(video.id for video in videos)
+    # ordered locks avoid deadlocks between overlapping batches
+    list(
+        Video.objects.select_for_update()
+        .filter(id__in=video_ids)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    return {
+        (x.video_id, x.type, x.parameters_hash): x
+        for x in PluginRun.objects.filter(
+            video_id__in=video_ids,
+            type__in=set(plugins),
+            status__in=IN_FLIGHT_STATUS,
+            parameters_hash__isnull=False,
+        ).order_by("date")
+    }
+
+
+def apply_plugin_run_task(task, plugin_run_id, args: Dict, **kwargs):
+    # remembers the task id so the run can be revoked when it is canceled
+    async_result = task.apply_async((args,), **kwargs)
+    PluginRun.objects.filter(id=plugin_run_id).update(celery_task_id=async_result.id)
+    return async_result
+
+
+def plugin_priority(plugin: str) -> int:
+    return getattr(settings, "PLUGIN_PRIORITIES", {}).get(
+        plugin, getattr(settings, "PLUGIN_RUN_DEFAULT_PRIORITY", 5)
+    )
+
+
+def celery_priority(priority: int) -> int:
+    # the redis transport handles 0 as the highest priority
+    return max(0, min(9, 9 - priority))
+
+
+def fair_share_order(queued: List[PluginRun], active: Dict, max_active: int = None):
+    """
+    Orders queued runs round robin over their owners, so every user gets one run per
+    round. Within a round users whose next run has the highest priority and who have
+    the fewest active runs go first. Returns the runs that may start now (respecting
+    max_active runs per user) and the remaining runs in queue order.
+    """
+    queues = {}
+    for plugin_run in queued:
+        queues.setdefault(plugin_run.video.owner_id, []).append(plugin_run)
+
+    taken = Counter(active)
+    dispatch = []
+    waiting = []
+    while queues:
+        owners = sorted(
+            queues,
+            key=lambda x: (-queues[x][0].priority, taken[x], queues[x][0].date),
+        )
+        for owner in owners:
+            plugin_run = queues[owner].pop(0)
+            if not queues[owner]:
+                del queues[owner]
+
+            if max_active is None or taken[owner] < max_active:
+                dispatch.append(plugin_run)
+            else:
+                waiting.append(plugin_run)
+            taken[owner] += 1
+
+    return dispatch, waiting
+
+
 def generate_plugin_run_result_cache(
     data_manager, plugin_run_result: List[str]
 ) -> None:
     for plugin_run_result_id in plugin_run_result:
         x = PluginRunResult.objects.get(id=plugin_run_result_id)
-        # print("B", flush=True)
-        cache_path = os.path.join(settings.DATA_CACHE_ROOT, f"{x.id}.json")
-        # print("C", flush=True)
-        # print(cache_path, flush=True)
-        cached = False
-        try:
-            if os.path.exists(cache_path):
-                with open(cache_path, "r") as f:
-                    cached = True
-        except Exception:
-            logger.exception("Cache reading failed")
-        if cached:
+        cached = os.path.exists(json_cache_path(x.id))
+        arrays_cached = os.path.exists(
+            os.path.join(array_cache_dir(x.id), "meta.json")
+        )
+        if cached and arrays_cached:
             continue
         # print(f"x {x}")
         # TODO fix me
@@ -159,13 +478,18 @@ def generate_plugin_run_result_cache(
             continue
         # print(data)
         with data:
-            result_dict = {**x.to_dict(), "data": data.to_dict()}
-            try:
-                with open(cache_path, "w") as f:
-                    json.dump(result_dict, f)
+            if not cached:
+                result_dict = {**x.to_dict(), "data": data.to_dict()}
+                try:
+                    write_result(x.id, result_dict)
                     logger.debug(f"Writin result {x.id} to cache")
+                except Exception:
+                    logger.exception("Cache couldn't write")
+            try:
+                # also builds the downsampled levels of scalar and histogram results
+                write_result_arrays(x.id, data)
             except Exception:
-                logger.exception("Cache couldn't write")
+                logger.exception("Array cache couldn't write")
 
 
 @shared_task(bind=True)
@@ -177,22 +501,48 @@ def run_plugin(self, args):
     plugin_run = args.get("plugin_run")
     dry_run = args.get("dry_run")
     kwargs = args.get("kwargs")
+    # replays after analyser jobs finished are scheduled by poll_plugin_run
+    resume = args.get("resume", False)
 
-    video_db = Video.objects.get(id=video)
-    user_db = TibavaUser.objects.get(id=user)
     plugin_run_db = None
     if not dry_run:
-        plugin_run_db = PluginRun.objects.get(id=plugin_run)
         # this job is already started in another jobqueue https://github.com/celery/celery/issues/4400
-        if plugin_run_db.in_scheduler:
-            logger.warning("Job was rescheduled and will be canceled")
-            return
-        plugin_run_db.in_scheduler = True
-        plugin_run_db.save()
+        # claiming the run is a single conditional update so two workers can't both win
+        if not resume:
+            claimed = PluginRun.objects.filter(id=plugin_run, in_scheduler=False).update(
+                in_scheduler=True
+            )
+            if not claimed:
+                logger.warning("Job was rescheduled and will be canceled")
+                return
+
+    try:
+        video_db = Video.objects.get(id=video)
+        user_db = TibavaUser.objects.get(id=user)
+        if not dry_run:
+            plugin_run_db = PluginRun.objects.get(id=plugin_run)
+    except Exception:
+        logger.exception(f"Plugin run {plugin_run} can't be started")
+        if not dry_run:
+            # a failed run no longer counts against the concurrency of its owner
+            PluginRun.objects.filter(id=plugin_run).exclude(
+                status=PluginRun.STATUS_CANCELED
+            ).update(status=PluginRun.STATUS_ERROR, update_date=timezone.now())
+            schedule_plugin_runs.delay()
+        return
+
+    if plugin_run_db is not None and plugin_run_db.status == PluginRun.STATUS_CANCELED:
+        logger.info(f"PluginRun {plugin_run} was canceled")
+        return
 
     plugin_manager = PluginManager()
     try:
-        plugin_result = plugin_manager._plugins[plugin]()(
+        task = plugin_manager._plugins[plugin]()
+        task.blocking = plugin_run_db is None or getattr(
+            settings, "PLUGIN_RUN_BLOCKING", True
+        )
+        task.replay = resume
+        plugin_result = task(
             parameters,
             user=user_db,
             video=video_db,
@@ -209,15 +559,199 @@ def run_plugin(self, args):
         )
 
         if plugin_run_db is not None:
-            plugin_run_db.progress = 1.0
-            plugin_run_db.status = PluginRun.STATUS_DONE
-            plugin_run_db.save()
+            plugin_run_db.set_status(PluginRun.STATUS_DONE, progress=1.0)
+            schedule_plugin_runs.delay()
 
         return
 
+    except AnalyserJobPending as pending:
+        logger.info(f"Plugin {plugin} is waiting for analyser jobs {pending.job_ids}")
+        apply_plugin_run_task(
+            poll_plugin_run,
+            plugin_run,
+            {**args, "resume": True, "job_ids": pending.job_ids},
+            countdown=getattr(settings, "PLUGIN_RUN_POLL_INTERVAL", 5),
+            priority=celery_priority(plugin_priority(plugin)),
+        )
+        return
+
+    except PluginRunCanceled:
+        logger.info(f"Plugin {plugin} was canceled")
+        return
+
     except Exception:
         logger.exception(f"Plugin run failed for {plugin}")
 
     if plugin_run_db is not None:
-        plugin_run_db.status = PluginRun.STATUS_ERROR
-        plugin_run_db.save()
+        plugin_run_db.set_status(PluginRun.STATUS_ERROR)
+        schedule_plugin_runs.delay()
+
+
+# postgres advisory lock that serializes schedule_plugin_runs
+SCHEDULE_LOCK_ID = 0x7469626176610001
+
+
+@shared_task(bind=True)
+def schedule_plugin_runs(self):
+    """
+    Hands queued plugin runs over to celery with fair_share_order and updates the
+    queue position of the runs that have to wait.
+    """
+    max_active = getattr(settings, "PLUGIN_RUN_USER_CONCURRENCY", None)
+
+    with transaction.atomic():
+        # one scheduler at a time, otherwise both see the same active runs and
+        # dispatch up to twice PLUGIN_RUN_USER_CONCURRENCY per user
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SCHEDULE_LOCK_ID])
+
+        queued = list(
+            PluginRun.objects.select_for_update(of=("self",))
+            .filter(
+                status=PluginRun.STATUS_QUEUED,
+                dispatched=False,
+                task_args__isnull=False,
+            )
+            .select_related("video")
+            .order_by("-priority", "date")
+        )
+        if not queued:
+            return
+
+        active = Counter(
+            PluginRun.objects.filter(
+                dispatched=True,
+                status__in=[
+                    PluginRun.STATUS_QUEUED,
+                    PluginRun.STATUS_WAITING,
+                    PluginRun.STATUS_RUNNING,
+                ],
+            ).values_list("video__owner", flat=True)
+        )
+
+        dispatch, waiting = fair_share_order(queued, active, max_active)
+
+        now = timezone.now()
+        for plugin_run in dispatch:
+            plugin_run.dispatched = True
+            plugin_run.queue_position = None
+            plugin_run.update_date = now
+        for position, plugin_run in enumerate(waiting):
+            if plugin_run.queue_position != position + 1:
+                plugin_run.queue_position = position + 1
+                plugin_run.update_date = now
+        PluginRun.objects.bulk_update(
+            queued, ["dispatched", "queue_position", "update_date"]
+        )
+
+        for plugin_run in dispatch:
+            transaction.on_commit(
+                partial(
+                    apply_plugin_run_task,
+                    run_plugin,
+                    plugin_run.id,
+                    plugin_run.task_args,
+                    priority=celery_priority(plugin_run.priority),
+                )
+            )
+
+    logger.info(f"Dispatched {len(dispatch)} plugin runs, {len(waiting)} are waiting")
+
+
+@shared_task(bind=True)
+def upload_video(self, video, plugin_runs=None):
+    """
+    Uploads a video to the analyser ahead of a batch of plugin runs, so they all find
+    it in the upload cache, and queues the runs afterwards. Failures are not fatal,
+    every plugin uploads on its own.
+    """
+    try:
+        video_db = Video.objects.get(id=video)
+        client = TaskAnalyserClient(
+            host=settings.GRPC_HOST,
+            port=settings.GRPC_PORT,
+            manager=DataManager("/predictions/"),
+        )
+        Task().upload_video(client, video_db)
+    except Exception:
+        logger.exception(f"Upload of video {video} failed")
+    finally:
+        if plugin_runs:
+            PluginRun.objects.filter(
+                id__in=plugin_runs, status=PluginRun.STATUS_WAITING, dispatched=False
+            ).update(status=PluginRun.STATUS_QUEUED, update_date=timezone.now())
+
+
+@shared_task(bind=True)
+def poll_plugin_run(self, args):
+    """
+    Checks the analyser jobs a plugin run is waiting for once and either schedules
+    itself again or replays the plugin with run_plugin when all jobs are finished.
+    """
+    try:
+        plugin_run_db = PluginRun.objects.get(id=args.get("plugin_run"))
+    except PluginRun.DoesNotExist:
+        logger.warning(f"PluginRun {args.get('plugin_run')} was deleted while waiting")
+        return
+
+    if plugin_run_db.status == PluginRun.STATUS_CANCELED:
+        logger.info(f"PluginRun {plugin_run_db.id} was canceled while waiting")
+        return
+
+    stages = PluginRunStage.objects.filter(
+        plugin_run=plugin_run_db, job_id__in=args.get("job_ids", [])
+    )
+
+    client = TaskAnalyserClient(
+        host=settings.GRPC_HOST,
+        port=settings.GRPC_PORT,
+        plugin_run_db=plugin_run_db,
+        manager=DataManager("/predictions/"),
+    )
+
+    timeout = getattr(settings, "PLUGIN_RUN_TIMEOUT", None)
+    priority = celery_priority(plugin_priority(args.get("plugin")))
+    pending_status = None
+    for stage in stages:
+        result = client.get_plugin_status(stage.job_id)
+        if result is None:
+            schedule_plugin_runs.delay()
+            return
+        if result.status == analyser_pb2.GetPluginStatusResponse.DONE:
+            continue
+
+        status = analyser_status_to_task_status(result.status)
+        if status is None or status == PluginRun.STATUS_ERROR:
+            logger.error(f"Analyser job {stage.job_id} of {stage.analyser} failed")
+            stage.status = PluginRun.STATUS_ERROR
+            stage.save(update_fields=["status", "update_date"])
+            plugin_run_db.set_status(PluginRun.STATUS_ERROR)
+            schedule_plugin_runs.delay()
+            return
+
+        if timeout and stage.date < timezone.now() - timedelta(seconds=timeout):
+            logger.error(f"Timeout of analyser job {stage.job_id} of {stage.analyser}")
+            plugin_run_db.set_status(PluginRun.STATUS_ERROR)
+            schedule_plugin_runs.delay()
+            return
+
+        if stage.status != status:
+            stage.status = status
+            stage.save(update_fields=["status", "update_date"])
+        if pending_status != PluginRun.STATUS_RUNNING:
+            pending_status = status
+
+    if pending_status is not None:
+        plugin_run_db.set_status(pending_status)
+        apply_plugin_run_task(
+            poll_plugin_run,
+            plugin_run_db.id,
+            args,
+            countdown=getattr(settings, "PLUGIN_RUN_POLL_INTERVAL", 5),
+            priority=priority,
+        )
+        return
+
+    apply_plugin_run_task(
+        run_plugin, plugin_run_db.id, {**args, "job_ids": []}, priority=priority
+    )
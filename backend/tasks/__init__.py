@@ -25,3 +25,10 @@ from .blip_vqa import *
 from .cluster_to_scalar import *
 from .invert_scalar import *
 from .ocr import *
+from .video_metadata import *
+from .deletion import *
+from .video_upload import *
+from .result_cache import *
+
+# has to be imported last, configured pipelines must not shadow plugins
+from .pipeline import *
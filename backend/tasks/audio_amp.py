@@ -58,8 +58,7 @@ class AudioAmp(Task):
             inputs={"video": video_id},
             outputs=["audio"],
         )
-        plugin_run.progress = 0.5
-        plugin_run.save()
+        plugin_run.set_progress(0.5)
 
         if result is None:
             raise Exception
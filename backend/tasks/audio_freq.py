@@ -59,8 +59,7 @@ class AudioFreq(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if result is None:
             raise Exception
@@ -56,10 +56,9 @@ class BLIPVQA(Task):
             manager=manager,
         )
 
-        video_id = self.upload_video(client, video)
-
-        shots_id = None
-        if parameters.get("shot_timeline_id"):
+        def shots_branch():
+            if not parameters.get("shot_timeline_id"):
+                return None
             shot_timeline_db = Timeline.objects.get(
                 id=parameters.get("shot_timeline_id")
             )
@@ -71,7 +70,12 @@ class BLIPVQA(Task):
             with shots:
                 for x in shot_timeline_segments:
                     shots.shots.append(Shot(start=x.start, end=x.end))
-            shots_id = client.upload_data(shots)
+            return client.upload_data(shots)
+
+        def video_branch():
+            return self.upload_video(client, video)
+
+        shots_id, video_id = self.run_parallel(shots_branch, video_branch)
 
         result = self.run_analyser(
             client,
@@ -99,8 +103,7 @@ class BLIPVQA(Task):
             raise Exception
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if result is None:
             raise Exception
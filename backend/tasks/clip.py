@@ -59,8 +59,7 @@ class CLIP(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.3
-            plugin_run.save()
+            plugin_run.set_progress(0.3)
 
         if result is None:
             raise Exception
@@ -74,8 +73,7 @@ class CLIP(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.6
-            plugin_run.save()
+            plugin_run.set_progress(0.6)
 
         if result is None:
             raise Exception
@@ -17,6 +17,7 @@ from backend.models import (
 )
 from backend.plugin_manager import PluginManager
 from backend.utils import media_path_to_video
+from backend.utils.ingest import ingest_annotations
 from backend.utils.parser import Parser
 from backend.utils.task import Task
 from analyser.data import Shot, DataManager
@@ -98,8 +99,7 @@ class CLIPOntology(Task):
             outputs=["embeddings"],
         )
         if plugin_run is not None:
-            plugin_run.progress = 0.25
-            plugin_run.save()
+            plugin_run.set_progress(0.25)
 
         if result is None:
             raise Exception
@@ -113,8 +113,7 @@ class CLIPOntology(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if result is None:
             raise Exception
@@ -127,8 +126,7 @@ class CLIPOntology(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.75
-            plugin_run.save()
+            plugin_run.set_progress(0.75)
 
         if aggregate_result is None:
             raise Exception
@@ -161,27 +159,13 @@ class CLIPOntology(Task):
                             name="Concept", video=video, owner=user
                         )
 
-                        for annotation in annotations_data.annotations:
-                            # create TimelineSegment
-                            timeline_segment_db = TimelineSegment.objects.create(
-                                timeline=annotation_timeline_db,
-                                start=annotation.start,
-                                end=annotation.end,
-                            )
-
-                            for label in annotation.labels:
-                                # add annotion to TimelineSegment
-                                annotation_db, _ = Annotation.objects.get_or_create(
-                                    name=label,
-                                    video=video,
-                                    category=category_db,
-                                    owner=user,
-                                )
-
-                                TimelineSegmentAnnotation.objects.create(
-                                    annotation=annotation_db,
-                                    timeline_segment=timeline_segment_db,
-                                )
+                        ingest_annotations(
+                            annotation_timeline_db,
+                            annotations_data.annotations,
+                            video=video,
+                            category=category_db,
+                            owner=user,
+                        )
 
                 data.extract_all(manager)
                 timeline_dict = {}
@@ -106,8 +106,7 @@ class ClusterToScalar(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.25
-            plugin_run.save()
+            plugin_run.set_progress(0.25)
 
         if video_facedetection is None:
             raise Exception
@@ -120,8 +119,7 @@ class ClusterToScalar(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if video_feature_result is None:
             raise Exception
@@ -141,8 +139,7 @@ class ClusterToScalar(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.75
-            plugin_run.save()
+            plugin_run.set_progress(0.75)
 
         if result is None:
             raise Exception
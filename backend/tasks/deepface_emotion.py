@@ -17,6 +17,7 @@ from backend.utils import media_path_to_video
 
 from ..utils.analyser_client import TaskAnalyserClient
 from analyser.data import Shot, ShotsData, DataManager
+from backend.utils.ingest import ingest_annotations
 from backend.utils.parser import Parser
 from backend.utils.task import Task
 
@@ -106,8 +107,7 @@ class DeepfaceEmotion(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.25
-            plugin_run.save()
+            plugin_run.set_progress(0.25)
 
         if result is None:
             raise Exception
@@ -121,8 +121,7 @@ class DeepfaceEmotion(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if emotion_result is None:
             raise Exception
@@ -135,8 +134,7 @@ class DeepfaceEmotion(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.75
-            plugin_run.save()
+            plugin_run.set_progress(0.75)
 
         if aggregate_result is None:
             raise Exception
@@ -176,27 +174,14 @@ class DeepfaceEmotion(Task):
                             name="Emotion", video=video, owner=user
                         )
 
-                        for annotation in annotations_data.annotations:
-                            # create TimelineSegment
-                            timeline_segment_db = TimelineSegment.objects.create(
-                                timeline=annotation_timeline_db,
-                                start=annotation.start,
-                                end=annotation.end,
-                            )
-
-                            for label in annotation.labels:
-                                # add annotion to TimelineSegment
-                                annotation_db, _ = Annotation.objects.get_or_create(
-                                    name=LABEL_LUT.get(label, label),
-                                    video=video,
-                                    category=category_db,
-                                    owner=user,
-                                )
-
-                                TimelineSegmentAnnotation.objects.create(
-                                    annotation=annotation_db,
-                                    timeline_segment=timeline_segment_db,
-                                )
+                        ingest_annotations(
+                            annotation_timeline_db,
+                            annotations_data.annotations,
+                            video=video,
+                            category=category_db,
+                            owner=user,
+                            label_fn=lambda label: LABEL_LUT.get(label, label),
+                        )
 
                 data.extract_all(manager)
                 data_list = {}
@@ -0,0 +1,120 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.models import ClusterItem, PluginRun, PluginRunResult, Video
+from backend.plugin_manager import IN_FLIGHT_STATUS, PluginManager
+from backend.utils.deletion import remove_plugin_run_result_files
+from analyser.data import DataManager
+
+
+logger = logging.getLogger(__name__)
+
+
+PURGE_BATCH_SIZE = 100
+PURGE_LOCK = "purge_deleted"
+# delay of the next attempt while canceled runs are still winding down (seconds)
+PURGE_RETRY_COUNTDOWN = 60
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+def purge_deleted(self):
+    """
+    Removes videos and plugin runs that were marked as deleted. The files of their
+    results are removed in batches by a thread pool before the rows are deleted, so
+    the task can be repeated after it failed halfway. Canceling a run only tells its
+    task to stop, so runs that are in flight or changed within DELETION_GRACE_PERIOD
+    seconds, and the videos they belong to, are left to a later attempt.
+    """
+    # one worker is enough, it picks up everything that is marked
+    if not cache.add(PURGE_LOCK, self.request.id or True, timeout=60 * 60):
+        return
+
+    try:
+        # runs of deleted videos should not write new results in the meantime
+        PluginManager().cancel(
+            PluginRun.objects.filter(video__deleted=True, status__in=IN_FLIGHT_STATUS)
+        )
+
+        cutoff = timezone.now() - timedelta(seconds=settings.DELETION_GRACE_PERIOD)
+        busy = PluginRun.all_objects.filter(
+            Q(status__in=IN_FLIGHT_STATUS) | Q(update_date__gte=cutoff)
+        )
+
+        # rows marked while the task runs are left to the next one
+        video_ids = list(
+            Video.all_objects.filter(deleted=True)
+            .exclude(id__in=busy.values("video_id"))
+            .values_list("id", flat=True)
+        )
+        plugin_run_ids = list(
+            PluginRun.all_objects.filter(deleted=True)
+            .exclude(id__in=busy.values("id"))
+            .values_list("id", flat=True)
+        )
+
+        plugin_runs = PluginRun.all_objects.filter(
+            Q(id__in=plugin_run_ids) | Q(video__in=video_ids)
+        )
+        results = PluginRunResult.objects.filter(plugin_run__in=plugin_runs)
+
+        data_manager = DataManager("/predictions/")
+        workers = max(1, settings.DELETION_WORKERS)
+        removed = 0
+        while True:
+            batch = list(results.order_by("id")[:PURGE_BATCH_SIZE])
+            if not batch:
+                break
+
+            cluster_image_paths = defaultdict(list)
+            for result_id, image_path in ClusterItem.objects.filter(
+                plugin_run_result__in=batch
+            ).values_list("plugin_run_result_id", "image_path"):
+                cluster_image_paths[result_id].append(image_path)
+
+            batch_ids = [x.id for x in batch]
+
+            def remove(plugin_run_result):
+                try:
+                    remove_plugin_run_result_files(
+                        data_manager,
+                        plugin_run_result,
+                        cluster_image_paths[plugin_run_result.id],
+                        deleted_results=batch_ids,
+                    )
+                finally:
+                    # every thread opens its own database connection
+                    connections.close_all()
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(remove, batch))
+
+            # delete_pluginresult_data skips the results of deleted runs and videos
+            PluginRunResult.objects.filter(id__in=batch_ids).delete()
+            removed += len(batch)
+
+        PluginRun.all_objects.filter(id__in=plugin_run_ids).delete()
+        Video.all_objects.filter(id__in=video_ids).delete()
+        logger.info(
+            f"Purged {len(video_ids)} videos, {len(plugin_run_ids)} plugin runs and "
+            f"{removed} plugin run results"
+        )
+    except Exception as e:
+        logger.exception("Purging deleted videos and plugin runs failed")
+        cache.delete(PURGE_LOCK)
+        raise self.retry(exc=e)
+    cache.delete(PURGE_LOCK)
+
+    if (
+        Video.all_objects.filter(deleted=True).exists()
+        or PluginRun.all_objects.filter(deleted=True).exists()
+    ):
+        purge_deleted.apply_async(countdown=PURGE_RETRY_COUNTDOWN)
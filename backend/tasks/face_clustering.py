@@ -86,8 +86,7 @@ class FaceClustering(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.2
-            plugin_run.save()
+            plugin_run.set_progress(0.2)
 
         if facedetector_result is None:
             raise Exception
@@ -104,8 +103,7 @@ class FaceClustering(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.4
-            plugin_run.save()
+            plugin_run.set_progress(0.4)
 
         if face_size_filter_result is None:
             raise Exception
@@ -124,8 +122,7 @@ class FaceClustering(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.6
-            plugin_run.save()
+            plugin_run.set_progress(0.6)
 
         if image_feature_result is None:
             raise Exception
@@ -168,8 +165,7 @@ class FaceClustering(Task):
             raise Exception
 
         if plugin_run is not None:
-            plugin_run.progress = 0.8
-            plugin_run.save()
+            plugin_run.set_progress(0.8)
 
         if cluster_result is None:
             raise Exception
@@ -235,41 +231,51 @@ class FaceClustering(Task):
                     type=PluginRunResult.TYPE_IMAGE_EMBEDDINGS,
                 )
 
+                # the first image of every face
+                image_lut = {}
+                for image in face_size_filter_result[1]["images"].images:
+                    image_lut.setdefault(image.ref_id, image)
+
                 # create a cti for every detected cluster
+                cluster_timeline_items_db = []
+                cluster_items_db = []
                 for cluster_index, cluster in enumerate(data.clusters):
-                    cluster_timeline_item_db = ClusterTimelineItem.objects.create(
+                    cluster_timeline_item_db = ClusterTimelineItem(
                         video=video,
                         cluster_id=cluster.id,
                         name=f"Cluster {cluster_index+1}",
                         plugin_run=plugin_run,
                     )
+                    cluster_timeline_items_db.append(cluster_timeline_item_db)
 
                     # create a face db item for every detected face
+                    sample_embedding_ids = set(cluster.sample_embedding_ids)
                     for face_index, embedding_id in enumerate(cluster.embedding_ids):
-                        image = [
-                            f
-                            for f in face_size_filter_result[1]["images"].images
-                            if f.ref_id == embedding_face_lut[embedding_id]
-                        ][0]
+                        image = image_lut[embedding_face_lut[embedding_id]]
                         image_path = os.path.join(
                             self.config.get("base_url"),
                             image.id[0:2],
                             image.id[2:4],
                             f"{image.id}.{image.ext}",
                         )
-                        _ = ClusterItem.objects.create(
-                            cluster_timeline_item=cluster_timeline_item_db,
-                            video=video,
-                            # plugin_item_ref=embedding_face_lut[embedding_id],
-                            embedding_id=embedding_id,
-                            image_path=image_path,
-                            plugin_run_result=plugin_run_result_db,
-                            type=ClusterItem.TYPE_FACE,
-                            time=image.time,
-                            delta_time=image.delta_time,
-                            is_sample=embedding_id in cluster.sample_embedding_ids,
+                        cluster_items_db.append(
+                            ClusterItem(
+                                cluster_timeline_item=cluster_timeline_item_db,
+                                video=video,
+                                # plugin_item_ref=embedding_face_lut[embedding_id],
+                                embedding_id=embedding_id,
+                                image_path=image_path,
+                                plugin_run_result=plugin_run_result_db,
+                                type=ClusterItem.TYPE_FACE,
+                                time=image.time,
+                                delta_time=image.delta_time,
+                                is_sample=embedding_id in sample_embedding_ids,
+                            )
                         )
 
+                ClusterTimelineItem.objects.bulk_create(cluster_timeline_items_db)
+                ClusterItem.objects.bulk_create(cluster_items_db, batch_size=1000)
+
                 return {
                     "plugin_run": plugin_run.id.hex,
                     "plugin_run_results": [
@@ -94,8 +94,7 @@ class InsightfaceFacesize(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.25
-            plugin_run.save()
+            plugin_run.set_progress(0.25)
 
         if shot_type_results is None:
             raise Exception
@@ -108,8 +107,7 @@ class InsightfaceFacesize(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if shot_size_annotation is None:
             raise Exception
@@ -125,8 +123,7 @@ class InsightfaceFacesize(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.75
-            plugin_run.save()
+            plugin_run.set_progress(0.75)
 
         facesize_result = self.run_analyser(
             client,
@@ -57,11 +57,8 @@ class InsightfaceIdentification(Task):
             plugin_run_db=plugin_run,
             manager=manager,
         )
-        # upload all data
-        video_id = self.upload_video(client, video)
 
-        # query image path
-        if parameters.get("embedding_ref") == None:
+        def query_branch():
             # load query image
             image_data = manager.create_data("ImagesData")
             with image_data:
@@ -79,10 +76,6 @@ class InsightfaceIdentification(Task):
                 outputs=["kpss", "faces"],
             )
 
-            if plugin_run is not None:
-                plugin_run.progress = 0.1
-                plugin_run.save()
-
             if facedetection_result is None:
                 raise Exception
 
@@ -98,44 +91,51 @@ class InsightfaceIdentification(Task):
                 outputs=["features"],
             )
 
-            if plugin_run is not None:
-                plugin_run.progress = 0.2
-                plugin_run.save()
-
             if query_image_feature_result is None:
                 raise Exception
 
-        # face detection on video
-        video_facedetection = self.run_analyser(
-            client,
-            "insightface_video_detector_torch",
-            parameters={
-                "fps": parameters.get("fps"),
-            },
-            inputs={"video": video_id},
-            outputs=["kpss", "faces"],
-        )
+            return query_image_feature_result
 
-        if plugin_run is not None:
-            plugin_run.progress = 0.4
-            plugin_run.save()
+        def video_branch():
+            # upload all data
+            video_id = self.upload_video(client, video)
 
-        if video_facedetection is None:
-            raise Exception
+            # face detection on video
+            video_facedetection = self.run_analyser(
+                client,
+                "insightface_video_detector_torch",
+                parameters={
+                    "fps": parameters.get("fps"),
+                },
+                inputs={"video": video_id},
+                outputs=["kpss", "faces"],
+            )
 
-        video_feature_result = self.run_analyser(
-            client,
-            "insightface_video_feature_extractor",
-            inputs={"video": video_id, "kpss": video_facedetection[0]["kpss"]},
-            outputs=["features"],
-        )
+            if video_facedetection is None:
+                raise Exception
 
-        if plugin_run is not None:
-            plugin_run.progress = 0.6
-            plugin_run.save()
+            video_feature_result = self.run_analyser(
+                client,
+                "insightface_video_feature_extractor",
+                inputs={"video": video_id, "kpss": video_facedetection[0]["kpss"]},
+                outputs=["features"],
+            )
 
-        if video_feature_result is None:
-            raise Exception
+            if video_feature_result is None:
+                raise Exception
+
+            return video_feature_result
+
+        # query image and video branch are independent of each other
+        if parameters.get("embedding_ref") == None:
+            query_image_feature_result, video_feature_result = self.run_parallel(
+                query_branch, video_branch
+            )
+        else:
+            (video_feature_result,) = self.run_parallel(video_branch)
+
+        if plugin_run is not None:
+            plugin_run.set_progress(0.6)
 
         result = self.run_analyser(
             client,
@@ -152,8 +152,7 @@ class InsightfaceIdentification(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.8
-            plugin_run.save()
+            plugin_run.set_progress(0.8)
 
         if result is None:
             raise Exception
@@ -18,6 +18,7 @@ from backend.models import (
 from backend.plugin_manager import PluginManager
 
 from ..utils.analyser_client import TaskAnalyserClient
+from backend.utils.ingest import ingest_annotations
 from backend.utils.parser import Parser
 from backend.utils.task import Task
 from django.db import transaction
@@ -97,25 +98,13 @@ class OCRTask(Task):
                     name="Transcript", video=video, owner=user
                 )
 
-                for annotation in data.annotations:
-                    timeline_segment_db = TimelineSegment.objects.create(
-                        timeline=annotation_timeline_db,
-                        start=annotation.start,
-                        end=annotation.end,
-                    )
-                    for label in annotation.labels:
-                        annotation_db, _ = Annotation.objects.get_or_create(
-                            name=str(label),
-                            video=video,
-                            category=category_db,
-                            owner=user,
-                            # color=color,
-                        )
-
-                        TimelineSegmentAnnotation.objects.create(
-                            annotation=annotation_db,
-                            timeline_segment=timeline_segment_db,
-                        )
+                ingest_annotations(
+                    annotation_timeline_db,
+                    data.annotations,
+                    video=video,
+                    category=category_db,
+                    owner=user,
+                )
 
                 return {
                     "plugin_run": plugin_run.id.hex,
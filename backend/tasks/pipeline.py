@@ -0,0 +1,244 @@
+from typing import Dict, List
+from functools import partial
+import logging
+
+from ..utils.analyser_client import TaskAnalyserClient
+
+from analyser.data import DataManager
+from backend.models import (
+    AnnotationCategory,
+    PluginRun,
+    PluginRunResult,
+    Video,
+    TibavaUser,
+    Timeline,
+)
+from backend.plugin_manager import PluginManager
+from backend.utils.ingest import create_segments, ingest_annotations, truncate_label
+from backend.utils.parser import Parser
+from backend.utils.pipeline import PipelineGraph, load_pipelines, parse_reference
+from backend.utils.task import Task
+from django.db import transaction
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+PARAMETER_PARSER = {"str": str, "float": float, "int": int}
+
+# result type -> (PluginRunResult type, Timeline visualization)
+RESULT_LUT = {
+    "scalar": (PluginRunResult.TYPE_SCALAR, Timeline.VISUALIZATION_SCALAR_COLOR),
+    "scalar_list": (PluginRunResult.TYPE_SCALAR, Timeline.VISUALIZATION_SCALAR_COLOR),
+    "hist": (PluginRunResult.TYPE_HIST, Timeline.VISUALIZATION_HIST),
+    "rgb_hist": (PluginRunResult.TYPE_RGB_HIST, Timeline.VISUALIZATION_COLOR),
+}
+
+PIPELINES = load_pipelines()
+
+
+def pipeline_valid_parameter(pipelines):
+    valid_parameter = {}
+    for pipeline in pipelines:
+        for k, v in pipeline.parameters.items():
+            valid_parameter[k] = {
+                **v,
+                "parser": PARAMETER_PARSER.get(v.get("parser"), str),
+            }
+    return valid_parameter
+
+
+class PipelineParser(Parser):
+    def __init__(self, names: List[str]):
+        self.valid_parameter = pipeline_valid_parameter(
+            [PIPELINES[name] for name in names]
+        )
+
+
+class PipelinesParser(Parser):
+    def __init__(self):
+        self.valid_parameter = {
+            **pipeline_valid_parameter(PIPELINES.values()),
+            "pipelines": {"parser": str, "required": True},
+        }
+
+
+class PipelineTask(Task):
+    def __init__(self, names: List[str] = None):
+        self.names = names
+        self.config = {
+            "output_path": "/predictions/",
+            "analyser_host": settings.GRPC_HOST,
+            "analyser_port": settings.GRPC_PORT,
+        }
+
+    def __call__(
+        self,
+        parameters: Dict,
+        video: Video = None,
+        user: TibavaUser = None,
+        plugin_run: PluginRun = None,
+        dry_run: bool = False,
+        **kwargs,
+    ):
+        names = self.names
+        if names is None:
+            names = [x.strip() for x in parameters.get("pipelines").split(",")]
+        for name in names:
+            if name not in PIPELINES:
+                raise Exception(f"Unknown pipeline {name}")
+        pipelines = [PIPELINES[name] for name in names]
+
+        manager = DataManager(self.config["output_path"])
+        client = TaskAnalyserClient(
+            host=self.config["analyser_host"],
+            port=self.config["analyser_port"],
+            plugin_run_db=plugin_run,
+            manager=manager,
+        )
+
+        graph = PipelineGraph()
+        signatures = [graph.add(pipeline, parameters) for pipeline in pipelines]
+
+        video_id = self.upload_video(client, video)
+        results = graph.run(self, client, video_id)
+
+        if plugin_run is not None:
+            plugin_run.set_progress(0.8)
+
+        if dry_run or plugin_run is None:
+            logging.warning("dry_run or plugin_run is None")
+            return {}
+
+        plugin_run_results = []
+        result_timelines = {}
+        result_data = {}
+        with transaction.atomic():
+            for pipeline, pipeline_signatures in zip(pipelines, signatures):
+                for i, result in enumerate(pipeline.results):
+                    node_id, output = parse_reference(result.get("input"))
+                    data = results[pipeline_signatures[node_id]][1][output]
+                    key = f"{pipeline.name}.{result.get('name', i)}"
+
+                    ingested = self.ingest_result(
+                        manager, result, data, video, user, plugin_run
+                    )
+                    plugin_run_results.extend(ingested["plugin_run_results"])
+                    result_timelines[key] = ingested["timeline"]
+                    result_data[key] = data.id
+
+        return {
+            "plugin_run": plugin_run.id.hex,
+            "plugin_run_results": plugin_run_results,
+            "timelines": result_timelines,
+            "data": result_data,
+        }
+
+    def ingest_result(self, manager, result, data, video, user, plugin_run):
+        result_type = result.get("type")
+        timeline_name = result.get("timeline", result.get("name", result_type))
+        plugin_run_results = []
+
+        with data:
+            if result_type in ("scalar", "hist", "rgb_hist"):
+                plugin_run_result_type, visualization = RESULT_LUT[result_type]
+                plugin_run_result_db = PluginRunResult.objects.create(
+                    plugin_run=plugin_run,
+                    data_id=data.id,
+                    name=result.get("name", result_type),
+                    type=plugin_run_result_type,
+                )
+                plugin_run_results.append(plugin_run_result_db.id.hex)
+                timeline_db = Timeline.objects.create(
+                    video=video,
+                    name=timeline_name,
+                    type=Timeline.TYPE_PLUGIN_RESULT,
+                    plugin_run_result=plugin_run_result_db,
+                    visualization=visualization,
+                )
+
+            elif result_type == "scalar_list":
+                data.extract_all(manager)
+                timeline_db = Timeline.objects.create(
+                    video=video,
+                    name=timeline_name,
+                    type=Timeline.TYPE_PLUGIN_RESULT,
+                )
+                for index, sub_data in zip(data.index, data.data):
+                    plugin_run_result_db = PluginRunResult.objects.create(
+                        plugin_run=plugin_run,
+                        data_id=sub_data,
+                        name=result.get("name", result_type),
+                        type=PluginRunResult.TYPE_SCALAR,
+                    )
+                    plugin_run_results.append(plugin_run_result_db.id.hex)
+                    Timeline.objects.create(
+                        video=video,
+                        name=index,
+                        type=Timeline.TYPE_PLUGIN_RESULT,
+                        plugin_run_result=plugin_run_result_db,
+                        visualization=Timeline.VISUALIZATION_SCALAR_COLOR,
+                        parent=timeline_db,
+                    )
+
+            elif result_type == "shots":
+                timeline_db = Timeline.objects.create(
+                    video=video,
+                    name=timeline_name,
+                    type=Timeline.TYPE_ANNOTATION,
+                )
+                create_segments(timeline_db, [(x.start, x.end) for x in data.shots])
+                plugin_run_result_db = PluginRunResult.objects.create(
+                    plugin_run=plugin_run,
+                    data_id=data.id,
+                    name=result.get("name", result_type),
+                    type=PluginRunResult.TYPE_SHOTS,
+                )
+                plugin_run_results.append(plugin_run_result_db.id.hex)
+
+            elif result_type == "images":
+                data.extract_all(manager)
+                timeline_db = None
+                plugin_run_result_db = PluginRunResult.objects.create(
+                    plugin_run=plugin_run,
+                    data_id=data.id,
+                    name=result.get("name", result_type),
+                    type=PluginRunResult.TYPE_IMAGES,
+                )
+                plugin_run_results.append(plugin_run_result_db.id.hex)
+
+            elif result_type == "annotations":
+                timeline_db = Timeline.objects.create(
+                    video=video,
+                    name=timeline_name,
+                    type=Timeline.TYPE_ANNOTATION,
+                )
+                category_db, _ = AnnotationCategory.objects.get_or_create(
+                    name=result.get("category", timeline_name), video=video, owner=user
+                )
+                ingest_annotations(
+                    timeline_db,
+                    data.annotations,
+                    video=video,
+                    category=category_db,
+                    owner=user,
+                    label_fn=truncate_label,
+                )
+
+        return {
+            "plugin_run_results": plugin_run_results,
+            "timeline": timeline_db.id.hex if timeline_db is not None else None,
+        }
+
+
+# every configured pipeline is a plugin, "pipelines" runs several with shared stages
+for name in PIPELINES:
+    if name in PluginManager._plugins:
+        logger.warning(f"Pipeline {name} shadows an existing plugin and is ignored")
+        continue
+    PluginManager.export_parser(name)(partial(PipelineParser, [name]))
+    PluginManager.export_plugin(name)(partial(PipelineTask, [name]))
+
+PluginManager.export_parser("pipelines")(PipelinesParser)
+PluginManager.export_plugin("pipelines")(PipelineTask)
@@ -107,8 +107,7 @@ class PlaceClustering(Task):
             raise Exception
 
         if plugin_run is not None:
-            plugin_run.progress = 0.2
-            plugin_run.save()
+            plugin_run.set_progress(0.2)
 
         # get embeddings for sampled frames within shots
         encoder_lut = {
@@ -127,14 +126,12 @@ class PlaceClustering(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.4
-            plugin_run.save()
+            plugin_run.set_progress(0.4)
 
         # TODO aggregate embeddings per shot
 
         if plugin_run is not None:
-            plugin_run.progress = 0.6
-            plugin_run.save()
+            plugin_run.set_progress(0.6)
 
         # perform clustering
         clustering_lut = {
@@ -158,8 +155,7 @@ class PlaceClustering(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.8
-            plugin_run.save()
+            plugin_run.set_progress(0.8)
 
         if cluster_result is None:
             raise Exception
@@ -219,15 +215,19 @@ class PlaceClustering(Task):
                 )
 
                 # create a cti for every detected cluster
+                cluster_timeline_items_db = []
+                cluster_items_db = []
                 for cluster_index, cluster in enumerate(data.clusters):
-                    cluster_timeline_item_db = ClusterTimelineItem.objects.create(
+                    cluster_timeline_item_db = ClusterTimelineItem(
                         video=video,
                         cluster_id=cluster.id,
                         name=f"Cluster {cluster_index+1}",
                         plugin_run=plugin_run,
                     )
+                    cluster_timeline_items_db.append(cluster_timeline_item_db)
 
                     # create a face db item for every detected face
+                    sample_embedding_ids = set(cluster.sample_embedding_ids)
                     for embedding_id in cluster.embedding_ids:
                         image_id = embedding_lut[embedding_id].ref_id
                         image_path = os.path.join(
@@ -236,18 +236,23 @@ class PlaceClustering(Task):
                             image_id[2:4],
                             f"{image_id}.jpg",
                         )
-                        _ = ClusterItem.objects.create(
-                            cluster_timeline_item=cluster_timeline_item_db,
-                            video=video,
-                            embedding_id=embedding_id,
-                            image_path=image_path,
-                            plugin_run_result=plugin_run_result_db,
-                            type=ClusterItem.TYPE_PLACE,
-                            time=embedding_lut[embedding_id].time,
-                            delta_time=embedding_lut[embedding_id].delta_time,
-                            is_sample=embedding_id in cluster.sample_embedding_ids,
+                        cluster_items_db.append(
+                            ClusterItem(
+                                cluster_timeline_item=cluster_timeline_item_db,
+                                video=video,
+                                embedding_id=embedding_id,
+                                image_path=image_path,
+                                plugin_run_result=plugin_run_result_db,
+                                type=ClusterItem.TYPE_PLACE,
+                                time=embedding_lut[embedding_id].time,
+                                delta_time=embedding_lut[embedding_id].delta_time,
+                                is_sample=embedding_id in sample_embedding_ids,
+                            )
                         )
 
+                ClusterTimelineItem.objects.bulk_create(cluster_timeline_items_db)
+                ClusterItem.objects.bulk_create(cluster_items_db, batch_size=1000)
+
                 return {
                     "plugin_run": plugin_run.id.hex,
                     "plugin_run_results": [
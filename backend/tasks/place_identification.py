@@ -74,8 +74,7 @@ class InsightfaceIdentification(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.3
-            plugin_run.save()
+            plugin_run.set_progress(0.3)
 
         if places_result is None:
             raise Exception
@@ -96,8 +95,7 @@ class InsightfaceIdentification(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.6
-            plugin_run.save()
+            plugin_run.set_progress(0.6)
 
         if result is None:
             raise Exception
@@ -20,6 +20,7 @@ from backend.plugin_manager import PluginManager
 from backend.utils import media_path_to_video
 
 from celery import shared_task
+from backend.utils.ingest import create_segments, link_annotations
 from backend.utils.parser import Parser
 from backend.utils.task import Task
 from django.db import transaction
@@ -72,11 +73,10 @@ class PlacesClassifier(Task):
             plugin_run_db=plugin_run,
             manager=manager,
         )
-        # upload all data
-        video_id = self.upload_video(client, video)
 
-        shots_id = None
-        if parameters.get("shot_timeline_id"):
+        def shots_branch():
+            if not parameters.get("shot_timeline_id"):
+                return None, None
             shot_timeline_db = Timeline.objects.get(
                 id=parameters.get("shot_timeline_id")
             )
@@ -88,19 +88,26 @@ class PlacesClassifier(Task):
             with shots:
                 for x in shot_timeline_segments:
                     shots.shots.append(Shot(start=x.start, end=x.end))
-            shots_id = client.upload_data(shots)
-
-        # start plugins
-        result = self.run_analyser(
-            client,
-            "places_classifier",
-            parameters={
-                "fps": parameters.get("fps"),
-            },
-            inputs={"video": video_id},
-            outputs=["probs_places365", "probs_places16", "probs_places3"],
-            downloads=["probs_places3"],
-        )
+            return shots, client.upload_data(shots)
+
+        def video_branch():
+            # upload all data
+            video_id = self.upload_video(client, video)
+
+            # start plugins
+            return self.run_analyser(
+                client,
+                "places_classifier",
+                parameters={
+                    "fps": parameters.get("fps"),
+                },
+                inputs={"video": video_id},
+                outputs=["probs_places365", "probs_places16", "probs_places3"],
+                downloads=["probs_places3"],
+            )
+
+        # the shots are only needed by the annotator after the classification
+        (shots, shots_id), result = self.run_parallel(shots_branch, video_branch)
 
         if result is None:
             raise Exception
@@ -109,8 +116,7 @@ class PlacesClassifier(Task):
         result_data = {}
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if dry_run or plugin_run is None:
             logging.warning("dry_run or plugin_run is None")
@@ -141,14 +147,12 @@ class PlacesClassifier(Task):
 
             result_timelines["annotation"] = annotation_timeline.id.hex
 
-            segments = {}
-            for shot in shots.shots:
-                timeline_segment_db = TimelineSegment.objects.create(
-                    timeline=annotation_timeline,
-                    start=shot.start,
-                    end=shot.end,
+            segments = {
+                segment.start: segment
+                for segment in create_segments(
+                    annotation_timeline, [(shot.start, shot.end) for shot in shots.shots]
                 )
-                segments[shot.start] = timeline_segment_db
+            }
 
             category_lut = {
                 "probs_places365": "Places365",
@@ -160,20 +164,16 @@ class PlacesClassifier(Task):
                     name=category_lut[key], video=video, owner=user
                 )
                 with result_annotations[key] as annotations:
-                    for annotation in annotations.annotations:
-                        for label in annotation.labels:
-                            # add annotion to TimelineSegment
-                            annotation_db, _ = Annotation.objects.get_or_create(
-                                name=label,
-                                video=video,
-                                category=category_db,
-                                owner=user,
-                            )
-
-                            timeline_db = TimelineSegmentAnnotation.objects.create(
-                                annotation=annotation_db,
-                                timeline_segment=segments[annotation.start],
-                            )
+                    link_annotations(
+                        [
+                            (segments[annotation.start], label)
+                            for annotation in annotations.annotations
+                            for label in annotation.labels
+                        ],
+                        video=video,
+                        category=category_db,
+                        owner=user,
+                    )
 
                     result_data[key] = result_annotations[key].id
 
@@ -0,0 +1,21 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from backend.utils.result_cache import evict
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True)
+def evict_result_cache(self):
+    """
+    Removes the least recently used results once the result cache exceeds
+    DATA_CACHE_MAX_SIZE. Runs every DATA_CACHE_EVICT_INTERVAL seconds from celery beat,
+    so requests and plugin runs never scan the cache themselves.
+    """
+    if settings.DATA_CACHE_MAX_SIZE is None:
+        return
+    evict()
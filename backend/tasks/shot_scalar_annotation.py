@@ -24,6 +24,7 @@ from backend.plugin_manager import PluginManager
 from backend.utils import media_path_to_video
 
 from analyser.data import DataManager
+from backend.utils.ingest import ingest_annotations
 from backend.utils.parser import Parser
 from backend.utils.task import Task
 
@@ -139,32 +140,23 @@ class ShotScalarAnnotation(Task):
                 h = random.random() * 359 / 360
                 s = 0.6
 
-                for annotation in data.annotations:
-                    timeline_segment_db = TimelineSegment.objects.create(
-                        timeline=annotation_timeline_db,
-                        start=annotation.start,
-                        end=annotation.end,
-                    )
-                    for label in annotation.labels:
-                        value = label
-                        try:
-                            v = (float(label) - min_val) / (max_val - min_val)
-                            value = round(float(label), 3)
-                        except:
-                            v = 0.6
-                        color = rgb_to_hex(hsv_to_rgb(h, s, v))
-                        annotation_db, _ = Annotation.objects.get_or_create(
-                            name=str(value),
-                            video=video,
-                            category=category_db,
-                            owner=user,
-                            color=color,
-                        )
-
-                        TimelineSegmentAnnotation.objects.create(
-                            annotation=annotation_db,
-                            timeline_segment=timeline_segment_db,
-                        )
+                def value_label(label):
+                    value = label
+                    try:
+                        v = (float(label) - min_val) / (max_val - min_val)
+                        value = round(float(label), 3)
+                    except:
+                        v = 0.6
+                    return str(value), rgb_to_hex(hsv_to_rgb(h, s, v))
+
+                ingest_annotations(
+                    annotation_timeline_db,
+                    data.annotations,
+                    video=video,
+                    category=category_db,
+                    owner=user,
+                    label_fn=value_label,
+                )
 
                 return {
                     "plugin_run": plugin_run.id.hex,
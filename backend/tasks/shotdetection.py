@@ -20,6 +20,7 @@ from backend.utils import media_path_to_video
 
 from ..utils.analyser_client import TaskAnalyserClient
 from analyser.data import DataManager
+from backend.utils.ingest import create_segments
 from backend.utils.parser import Parser
 from backend.utils.task import Task
 
@@ -85,14 +86,7 @@ class ShotDetection(Task):
                     name=parameters.get("timeline"),
                     type=Timeline.TYPE_ANNOTATION,
                 )
-                for shot in d.shots:
-                    segment_id = uuid.uuid4().hex
-                    timeline_segment = TimelineSegment.objects.create(
-                        timeline=timeline,
-                        id=segment_id,
-                        start=shot.start,
-                        end=shot.end,
-                    )
+                create_segments(timeline, [(shot.start, shot.end) for shot in d.shots])
 
                 plugin_run_result_db = PluginRunResult.objects.create(
                     plugin_run=plugin_run,
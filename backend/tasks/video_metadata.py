@@ -0,0 +1,47 @@
+import logging
+
+import imageio
+from celery import shared_task
+from django.core.cache import cache
+
+from backend.models import Video
+from backend.utils import media_path_to_video
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True)
+def probe_video_metadata(self, video):
+    """
+    Fills the meta information of a video that the header probe at upload could not
+    read by opening the file with imageio, which decodes the stream.
+    """
+    try:
+        video_db = Video.objects.get(id=video)
+    except Video.DoesNotExist:
+        logger.warning(f"Video {video} was deleted before its meta data was read")
+        return
+
+    file_id = video_db.file if video_db.file else video_db.id
+    try:
+        reader = imageio.get_reader(media_path_to_video(file_id.hex, video_db.ext))
+        meta = reader.get_meta_data()
+        reader.close()
+    except Exception:
+        logger.exception(f"Reading the meta data of video {video} failed")
+        return
+
+    meta = {
+        "fps": meta.get("fps"),
+        "duration": meta.get("duration"),
+        "width": meta["size"][0] if meta.get("size") else None,
+        "height": meta["size"][1] if meta.get("size") else None,
+    }
+    # only the values the probe couldn't read are replaced
+    update = {k: v for k, v in meta.items() if getattr(video_db, k) is None and v is not None}
+    if update:
+        Video.objects.filter(id=video_db.id).update(**update)
+
+    if video_db.file_hash and None not in meta.values():
+        cache.set(f"video_probe:{video_db.file_hash}", meta)
@@ -0,0 +1,38 @@
+import os
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from backend.models import VideoUploadSession
+from backend.utils import media_dir_to_video
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True)
+def cleanup_video_uploads(self):
+    """
+    Removes upload sessions without any new chunk for VIDEO_UPLOAD_SESSION_TTL seconds,
+    their chunks and the preallocated file.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.VIDEO_UPLOAD_SESSION_TTL)
+    stale = VideoUploadSession.objects.filter(update_date__lt=cutoff).exclude(
+        chunks__date__gte=cutoff
+    )
+
+    count = 0
+    for upload_db in stale:
+        # delete_video_upload_file removes the .part file
+        upload_db.delete()
+        try:
+            os.rmdir(media_dir_to_video(upload_db.id.hex))
+        except OSError:
+            pass
+        count += 1
+
+    if count:
+        logger.info(f"Removed {count} abandoned video uploads")
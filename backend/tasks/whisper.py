@@ -7,6 +7,7 @@ from backend.models import PluginRun, PluginRunResult, Video, Timeline
 from backend.plugin_manager import PluginManager
 from backend.utils import media_path_to_video
 
+from backend.utils.ingest import ingest_annotations, truncate_label
 from backend.utils.parser import Parser
 from backend.utils.task import Task
 
@@ -69,8 +70,7 @@ class Whisper(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.5
-            plugin_run.save()
+            plugin_run.set_progress(0.5)
 
         if result is None:
             raise Exception
@@ -103,31 +103,14 @@ class Whisper(Task):
                     name="Transcript", video=video, owner=user
                 )
 
-                for annotation in data.annotations:
-                    timeline_segment_db = TimelineSegment.objects.create(
-                        timeline=annotation_timeline_db,
-                        start=annotation.start,
-                        end=annotation.end,
-                    )
-                    for label in annotation.labels:
-                        label = str(label)
-                        if len(label) > settings.ANNOTATION_MAX_LENGTH:
-                            label = (
-                                label[: max(0, settings.ANNOTATION_MAX_LENGTH - 4)]
-                                + " ..."
-                            )
-                        annotation_db, _ = Annotation.objects.get_or_create(
-                            name=label,
-                            video=video,
-                            category=category_db,
-                            owner=user,
-                            # color=color,
-                        )
-
-                        TimelineSegmentAnnotation.objects.create(
-                            annotation=annotation_db,
-                            timeline_segment=timeline_segment_db,
-                        )
+                ingest_annotations(
+                    annotation_timeline_db,
+                    data.annotations,
+                    video=video,
+                    category=category_db,
+                    owner=user,
+                    label_fn=truncate_label,
+                )
 
                 return {
                     "plugin_run": plugin_run.id.hex,
@@ -61,8 +61,7 @@ class XCLIP(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.3
-            plugin_run.save()
+            plugin_run.set_progress(0.3)
 
         if result is None:
             raise Exception
@@ -76,8 +75,7 @@ class XCLIP(Task):
         )
 
         if plugin_run is not None:
-            plugin_run.progress = 0.6
-            plugin_run.save()
+            plugin_run.set_progress(0.6)
 
         if result is None:
             raise Exception
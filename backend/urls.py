@@ -11,6 +11,24 @@ urlpatterns = [
     path("user/get", views.UserGet.as_view(), name="user_get"),
     #
     path("video/upload", views.VideoUpload.as_view(), name="video_upload"),
+    path(
+        "video/upload/init", views.VideoUploadInit.as_view(), name="video_upload_init"
+    ),
+    path(
+        "video/upload/chunk",
+        views.VideoUploadChunkPut.as_view(),
+        name="video_upload_chunk",
+    ),
+    path(
+        "video/upload/status",
+        views.VideoUploadStatus.as_view(),
+        name="video_upload_status",
+    ),
+    path(
+        "video/upload/complete",
+        views.VideoUploadComplete.as_view(),
+        name="video_upload_complete",
+    ),
     path("video/list", views.VideoList.as_view(), name="video_list"),
     path("video/get", views.VideoGet.as_view(), name="video_get"),
     path("video/rename", views.VideoRename.as_view(), name="video_rename"),
@@ -20,15 +38,36 @@ urlpatterns = [
     #
     path("plugin/list", views.PluginList.as_view(), name="plugin_list"),
     path("plugin/run/new", views.PluginRunNew.as_view(), name="plugin_run_new"),
+    path(
+        "plugin/run/batch/new",
+        views.PluginRunBatchNew.as_view(),
+        name="plugin_run_batch_new",
+    ),
     path("plugin/run/list", views.PluginRunList.as_view(), name="plugin_run_list"),
     path(
         "plugin/run/delete", views.PluginRunDelete.as_view(), name="plugin_run_delete"
     ),
+    path(
+        "plugin/run/changes",
+        views.PluginRunChanges.as_view(),
+        name="plugin_run_changes",
+    ),
+    path(
+        "plugin/run/resume", views.PluginRunResume.as_view(), name="plugin_run_resume"
+    ),
+    path(
+        "plugin/run/cancel", views.PluginRunCancel.as_view(), name="plugin_run_cancel"
+    ),
     path(
         "plugin/run/result/list",
         views.PluginRunResultList.as_view(),
         name="plugin_run_list",
     ),
+    path(
+        "plugin/run/result/slice",
+        views.PluginRunResultSlice.as_view(),
+        name="plugin_run_result_slice",
+    ),
     #
     path(
         "cluster/timeline/item/create",
@@ -1,7 +1,12 @@
 from .image import image_normalize, image_resize
 from .upload import download_file, download_url, check_extension
 from .urls import media_url_to_video, media_path_to_video, media_dir_to_video
-from .communication import RetryOnRpcErrorClientInterceptor, ExponentialBackoff
+from .communication import (
+    RetryOnRpcErrorClientInterceptor,
+    ExponentialBackoff,
+    channel_pool,
+)
 from .dicts import unflat_dict, flat_dict
 from .archive import TarArchive, ZipArchive
 from .color import rgb_to_hex, hsv_to_rgb, random_rgb
+from .hash import file_hash
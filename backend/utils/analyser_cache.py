@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from backend.models import AnalyserResultCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_parameter(value):
+    # the parser returns 2.0 for user input while defaults are often plain ints
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    if isinstance(value, dict):
+        return {k: normalize_parameter(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_parameter(v) for v in value]
+    return value
+
+
+def analyser_cache_key(client, analyser: str, inputs: Dict, parameters: Dict) -> str:
+    key = {
+        "host": str(client.host),
+        "port": str(client.port),
+        "analyser": analyser,
+        "inputs": inputs,
+        "parameters": normalize_parameter(parameters),
+    }
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def load_analyser_cache(client, key: str, required: List = None) -> Dict:
+    """
+    Returns the stored outputs of a stage, or None if there is no valid entry. Every
+    required output is checked against the analyser before the entry is used.
+    """
+    ttl = getattr(settings, "ANALYSER_RESULT_CACHE_TTL", None)
+
+    cache_db = AnalyserResultCache.objects.filter(key=key).first()
+    if cache_db is None:
+        return None
+
+    if ttl and cache_db.date < timezone.now() - timedelta(seconds=ttl):
+        cache_db.delete()
+        return None
+
+    if required is None:
+        required = []
+    for name in required:
+        data_id = cache_db.outputs.get(name)
+        if data_id is None or not client.check_data(data_id):
+            logger.info(f"Cached output {name} of {cache_db.analyser} is gone")
+            cache_db.delete()
+            return None
+
+    AnalyserResultCache.objects.filter(id=cache_db.id).update(
+        hits=F("hits") + 1, last_used=timezone.now()
+    )
+    return cache_db.outputs
+
+
+def store_analyser_cache(client, key: str, analyser: str, outputs: Dict) -> None:
+    AnalyserResultCache.objects.update_or_create(
+        key=key,
+        defaults={
+            "analyser": analyser,
+            "host": str(client.host),
+            "port": str(client.port),
+            "outputs": outputs,
+        },
+    )
+    evict_analyser_cache()
+
+
+def evict_analyser_cache() -> int:
+    ttl = getattr(settings, "ANALYSER_RESULT_CACHE_TTL", None)
+    max_entries = getattr(settings, "ANALYSER_RESULT_CACHE_MAX_ENTRIES", None)
+
+    deleted = 0
+    if ttl:
+        deleted += AnalyserResultCache.objects.filter(
+            date__lt=timezone.now() - timedelta(seconds=ttl)
+        ).delete()[0]
+
+    if max_entries:
+        stale_ids = list(
+            AnalyserResultCache.objects.order_by("-last_used").values_list(
+                "id", flat=True
+            )[max_entries:]
+        )
+        if stale_ids:
+            deleted += AnalyserResultCache.objects.filter(id__in=stale_ids).delete()[0]
+
+    if deleted:
+        logger.info(f"Evicted {deleted} analyser cache entries")
+    return deleted
@@ -3,16 +3,61 @@ import logging
 
 import grpc
 
+from django.conf import settings
+
 from analyser.analyser.client import AnalyserClient
 from analyser.proto import analyser_pb2
 from analyser.proto import analyser_pb2_grpc
 from backend.models import PluginRun
-from backend.utils import RetryOnRpcErrorClientInterceptor, ExponentialBackoff
+from backend.utils import RetryOnRpcErrorClientInterceptor, ExponentialBackoff, channel_pool
 
 
 logger = logging.getLogger(__name__)
 
 
+CHANNEL_OPTIONS = (
+    ("grpc.max_send_message_length", 50 * 1024 * 1024),
+    ("grpc.max_receive_message_length", 50 * 1024 * 1024),
+    ("grpc.keepalive_time_ms", 30 * 1000),
+    ("grpc.keepalive_timeout_ms", 10 * 1000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+)
+
+# values of grpc_compression_algorithm in the grpc core
+COMPRESSION_ALGORITHMS = {"deflate": 1, "gzip": 2}
+
+
+def channel_options():
+    options = CHANNEL_OPTIONS
+    compression = getattr(settings, "ANALYSER_GRPC_COMPRESSION", None)
+    if compression:
+        if compression not in COMPRESSION_ALGORITHMS:
+            logger.warning(f"Unknown grpc compression {compression} is ignored")
+        else:
+            options += (
+                ("grpc.default_compression_algorithm", COMPRESSION_ALGORITHMS[compression]),
+            )
+    return options
+
+
+class PluginRunCanceled(Exception):
+    """
+    Raised inside a task when its plugin run was canceled, the analyser job is left
+    alone and its outputs are not downloaded.
+    """
+
+
+def raise_if_canceled(plugin_run_db):
+    if plugin_run_db is None:
+        return
+    if PluginRun.objects.filter(
+        id=plugin_run_db.id, status=PluginRun.STATUS_CANCELED
+    ).exists():
+        plugin_run_db.status = PluginRun.STATUS_CANCELED
+        raise PluginRunCanceled(f"PluginRun {plugin_run_db.id} was canceled")
+
+
 def analyser_status_to_task_status(analyser_status):
     if analyser_status == analyser_pb2.GetPluginStatusResponse.WAITING:
         return PluginRun.STATUS_WAITING
@@ -31,6 +76,10 @@ class TaskAnalyserClient(AnalyserClient):
         self.host = kwargs.get("host")
         self.port = kwargs.get("port")
 
+        # the channel of the base client is replaced by a pooled one
+        if getattr(self, "channel", None) is not None:
+            self.channel.close()
+
         interceptors = (
             RetryOnRpcErrorClientInterceptor(
                 max_attempts=4,
@@ -40,13 +89,7 @@ class TaskAnalyserClient(AnalyserClient):
         )
 
         self.channel = grpc.intercept_channel(
-            grpc.insecure_channel(
-                f"{self.host}:{self.port}",
-                options=[
-                    ("grpc.max_send_message_length", 50 * 1024 * 1024),
-                    ("grpc.max_receive_message_length", 50 * 1024 * 1024),
-                ],
-            ),
+            channel_pool.get(self.host, self.port, channel_options()),
             *interceptors,
         )
 
@@ -57,8 +100,7 @@ class TaskAnalyserClient(AnalyserClient):
         except grpc.RpcError as rpc_error:
             logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
             if plugin_run_db:
-                plugin_run_db.status = PluginRun.STATUS_ERROR
-                plugin_run_db.save()
+                plugin_run_db.set_status(PluginRun.STATUS_ERROR)
         return None
 
     def upload_data(self, *args, **kwargs):
@@ -68,8 +110,7 @@ class TaskAnalyserClient(AnalyserClient):
         except grpc.RpcError as rpc_error:
             logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
             if plugin_run_db:
-                plugin_run_db.status = PluginRun.STATUS_ERROR
-                plugin_run_db.save()
+                plugin_run_db.set_status(PluginRun.STATUS_ERROR)
         return None
 
     def upload_file(self, *args, **kwargs):
@@ -79,10 +120,17 @@ class TaskAnalyserClient(AnalyserClient):
         except grpc.RpcError as rpc_error:
             logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
             if plugin_run_db:
-                plugin_run_db.status = PluginRun.STATUS_ERROR
-                plugin_run_db.save()
+                plugin_run_db.set_status(PluginRun.STATUS_ERROR)
         return None
 
+    def check_data(self, *args, **kwargs):
+        # only a liveness probe, a failure here should not mark the run as failed
+        try:
+            return super().check_data(*args, **kwargs)
+        except grpc.RpcError as rpc_error:
+            logger.warning(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
+        return False
+
     def run_plugin(self, *args, **kwargs):
         plugin_run_db = self.plugin_run_db
         try:
@@ -90,8 +138,7 @@ class TaskAnalyserClient(AnalyserClient):
         except grpc.RpcError as rpc_error:
             logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
             if plugin_run_db:
-                plugin_run_db.status = PluginRun.STATUS_ERROR
-                plugin_run_db.save()
+                plugin_run_db.set_status(PluginRun.STATUS_ERROR)
         return None
 
     def get_plugin_status(self, *args, **kwargs):
@@ -101,8 +148,7 @@ class TaskAnalyserClient(AnalyserClient):
         except grpc.RpcError as rpc_error:
             logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
             if plugin_run_db:
-                plugin_run_db.status = PluginRun.STATUS_ERROR
-                plugin_run_db.save()
+                plugin_run_db.set_status(PluginRun.STATUS_ERROR)
         return None
 
     def download_data(self, *args, **kwargs):
@@ -112,8 +158,7 @@ class TaskAnalyserClient(AnalyserClient):
         except grpc.RpcError as rpc_error:
             logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
             if plugin_run_db:
-                plugin_run_db.status = PluginRun.STATUS_ERROR
-                plugin_run_db.save()
+                plugin_run_db.set_status(PluginRun.STATUS_ERROR)
         return None
 
     def download_data_to_blob(self, *args, **kwargs):
@@ -123,8 +168,7 @@ class TaskAnalyserClient(AnalyserClient):
         except grpc.RpcError as rpc_error:
             logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
             if plugin_run_db:
-                plugin_run_db.status = PluginRun.STATUS_ERROR
-                plugin_run_db.save()
+                plugin_run_db.set_status(PluginRun.STATUS_ERROR)
         return None
 
     # 24 hours timeout
@@ -137,36 +181,32 @@ class TaskAnalyserClient(AnalyserClient):
         if status_fn is None:
             status_fn = analyser_status_to_task_status
         while True:
+            raise_if_canceled(plugin_run_db)
             if timeout:
                 if time.time() - start_time > timeout:
                     logger.error(f"Timeout")
                     if plugin_run_db:
-                        plugin_run_db.status = PluginRun.STATUS_ERROR
-                        plugin_run_db.save()
+                        plugin_run_db.set_status(PluginRun.STATUS_ERROR)
                     return None
             try:
                 result = self.get_plugin_status(job_id)
             except grpc.RpcError as rpc_error:
                 logger.error(f"GRPC error: code={rpc_error.code()} message={rpc_error.details()}")
                 if plugin_run_db:
-                    plugin_run_db.status = PluginRun.STATUS_ERROR
-                    plugin_run_db.save()
+                    plugin_run_db.set_status(PluginRun.STATUS_ERROR)
 
                 return None
             if result is None:
                 logger.error(f"GRPC error: not valid return Code")
                 if plugin_run_db:
-                    plugin_run_db.status = PluginRun.STATUS_ERROR
-                    plugin_run_db.save()
+                    plugin_run_db.set_status(PluginRun.STATUS_ERROR)
 
                 return None
 
             if plugin_run_db is not None:
                 status = status_fn(result.status)
                 if status is not None:
-                    plugin_run_db.status = status
-
-                plugin_run_db.save()
+                    plugin_run_db.set_status(status)
 
             if result.status == analyser_pb2.GetPluginStatusResponse.UNKNOWN:
                 logger.error("Job is unknown by the analyser")
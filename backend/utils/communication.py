@@ -1,6 +1,10 @@
 import logging
 import time
 import abc
+import atexit
+import functools
+import os
+import threading
 
 from random import randint
 from typing import Optional, Tuple
@@ -70,3 +74,60 @@ class RetryOnRpcErrorClientInterceptor(grpc.UnaryUnaryClientInterceptor, grpc.St
 
     def intercept_stream_unary(self, continuation, client_call_details, request_iterator):
         return self._intercept_call(continuation, client_call_details, request_iterator)
+
+
+class ChannelPool:
+    """
+    Process wide pool of grpc channels keyed by host, port and channel options. A channel
+    that was shut down is replaced on the next request, channels inherited from a parent
+    process (e.g. a forked celery worker) are never reused. Channels in TRANSIENT_FAILURE
+    are kept, grpc reconnects them itself and other threads may still be using them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._channels = {}
+        self._states = {}
+
+    def get(self, host, port, options: Tuple = ()):
+        key = (str(host), str(port), tuple(options))
+        with self._lock:
+            if self._pid != os.getpid():
+                # grpc channels don't survive a fork, just forget them
+                self._pid = os.getpid()
+                self._channels = {}
+                self._states = {}
+
+            channel = self._channels.get(key)
+            if (
+                channel is not None
+                and self._states.get(key) == grpc.ChannelConnectivity.SHUTDOWN
+            ):
+                logger.info(f"Replacing closed channel to {host}:{port}")
+                channel = None
+
+            if channel is None:
+                channel = grpc.insecure_channel(f"{host}:{port}", options=list(options))
+                channel.subscribe(
+                    functools.partial(self._update_state, key), try_to_connect=False
+                )
+                self._channels[key] = channel
+                self._states[key] = None
+
+            return channel
+
+    def _update_state(self, key, state):
+        self._states[key] = state
+
+    def close(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                for channel in self._channels.values():
+                    channel.close()
+            self._channels = {}
+            self._states = {}
+
+
+channel_pool = ChannelPool()
+atexit.register(channel_pool.close)
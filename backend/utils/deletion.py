@@ -0,0 +1,113 @@
+import os
+import logging
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List
+
+from django.db.models import Q
+
+from backend.utils.result_cache import delete_result as delete_cached_result
+
+
+logger = logging.getLogger(__name__)
+
+
+SHARED_QUERY_BATCH_SIZE = 100
+
+
+def images_data_files(data_manager, data_id) -> Dict[str, str]:
+    data = data_manager.load(data_id)
+    if data is None:
+        return {}
+    try:
+        with data:
+            data.load()
+        images = data.images
+    except AttributeError:
+        images = []
+    return {
+        image.id: data_manager._create_file_path(image.id, image.ext)
+        for image in images
+    }
+
+
+def cluster_item_files(data_manager, image_paths: Iterable[str]) -> Dict[str, str]:
+    paths = {}
+    for image_path in image_paths:
+        if not image_path:
+            continue
+        filename, ext = image_path.split("/")[-1].split(".")
+        paths[filename] = data_manager._create_file_path(filename, ext)
+    return paths
+
+
+def shared_file_ids(file_ids: Iterable[str], other_results, other_items) -> set:
+    """
+    Returns the ids that another result uses as data or another cluster item shows as
+    thumbnail.
+    """
+    file_ids = list(file_ids)
+    shared = set()
+    for i in range(0, len(file_ids), SHARED_QUERY_BATCH_SIZE):
+        batch = file_ids[i : i + SHARED_QUERY_BATCH_SIZE]
+        shared.update(
+            other_results.filter(data_id__in=batch).values_list("data_id", flat=True)
+        )
+        image_paths = other_items.filter(
+            reduce(or_, [Q(image_path__contains=x) for x in batch])
+        ).values_list("image_path", flat=True)
+        for image_path in image_paths:
+            shared.update(x for x in batch if x in image_path)
+    return shared
+
+
+def remove_files(paths: Iterable[str]) -> int:
+    """
+    Removes files that still exist, so that an interrupted deletion can be repeated.
+    """
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def remove_plugin_run_result_files(
+    data_manager,
+    plugin_run_result,
+    cluster_image_paths: Iterable[str] = (),
+    deleted_results: Iterable = (),
+) -> None:
+    """
+    Removes the prediction data of a result with its thumbnails and cache entries.
+    Stage reuse and the analyser cache let several results point to the same data, so
+    anything another result or cluster item still refers to is kept. deleted_results
+    are removed together with this one and don't count as references.
+    """
+    # models imports this module
+    from backend.models import ClusterItem, PluginRunResult
+
+    deleted_results = set(deleted_results) | {plugin_run_result.id}
+    other_results = PluginRunResult.objects.exclude(id__in=deleted_results)
+    other_items = ClusterItem.objects.exclude(plugin_run_result__in=deleted_results)
+
+    data_id = plugin_run_result.data_id
+    package_shared = bool(data_id) and other_results.filter(data_id=data_id).exists()
+
+    files = cluster_item_files(data_manager, cluster_image_paths)
+    if plugin_run_result.type == plugin_run_result.TYPE_IMAGES and not package_shared:
+        files.update(images_data_files(data_manager, data_id))
+    shared = shared_file_ids(files.keys(), other_results, other_items)
+    if shared:
+        logger.info(f"Keeping {len(shared)} files that other results still use")
+    remove_files(path for file_id, path in files.items() if file_id not in shared)
+
+    delete_cached_result(plugin_run_result.id)
+    if data_id and not package_shared:
+        try:
+            data_manager.delete(data_id)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,16 @@
+import hashlib
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """
+    Streaming sha256 of a file without reading it into memory at once.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,140 @@
+"""
+Bulk ingestion of plugin results into timelines.
+
+Annotations are resolved for a whole timeline at once and segments and their
+annotation links are written with bulk_create, so ingesting a result takes a constant
+number of queries per timeline instead of several per segment. Labels are either a
+name or a (name, color) tuple; with a color only annotations of that color match,
+like the color argument of Annotation.objects.get_or_create.
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+
+from backend.models import (
+    Annotation,
+    AnnotationCategory,
+    Timeline,
+    TimelineSegment,
+    TimelineSegmentAnnotation,
+    TibavaUser,
+    Video,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_SIZE = 1000
+
+
+def truncate_label(label) -> str:
+    label = str(label)
+    if len(label) > settings.ANNOTATION_MAX_LENGTH:
+        label = label[: max(0, settings.ANNOTATION_MAX_LENGTH - 4)] + " ..."
+    return label
+
+
+def label_key(label) -> Tuple[str, str]:
+    if isinstance(label, tuple):
+        return str(label[0]), label[1]
+    return str(label), None
+
+
+def create_segments(
+    timeline: Timeline, spans: Iterable[Tuple[float, float]]
+) -> List[TimelineSegment]:
+    segments = [
+        TimelineSegment(timeline=timeline, start=start, end=end) for start, end in spans
+    ]
+    TimelineSegment.objects.bulk_create(segments, batch_size=BATCH_SIZE)
+    return segments
+
+
+def resolve_annotations(
+    labels: Iterable,
+    video: Video,
+    category: AnnotationCategory,
+    owner: TibavaUser,
+) -> Dict[Tuple[str, str], Annotation]:
+    """
+    Returns an annotation for every label. Existing annotations of the category are
+    reused, missing ones are created together.
+    """
+    keys = {label_key(x) for x in labels}
+    names = sorted({name for name, _ in keys})
+
+    existing = {}
+    for i in range(0, len(names), BATCH_SIZE):
+        for annotation in Annotation.objects.filter(
+            video=video,
+            category=category,
+            owner=owner,
+            name__in=names[i : i + BATCH_SIZE],
+        ).order_by("id"):
+            existing.setdefault((annotation.name, None), annotation)
+            existing.setdefault((annotation.name, annotation.color), annotation)
+
+    result = {}
+    missing = []
+    for name, color in sorted(keys, key=lambda x: (x[0], x[1] or "")):
+        annotation = existing.get((name, color))
+        if annotation is None:
+            annotation = Annotation(name=name, video=video, category=category, owner=owner)
+            if color is not None:
+                annotation.color = color
+            missing.append(annotation)
+            existing[(name, color)] = annotation
+            existing.setdefault((name, None), annotation)
+        result[(name, color)] = annotation
+
+    Annotation.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+    return result
+
+
+def link_annotations(
+    links: Iterable[Tuple[TimelineSegment, object]],
+    video: Video,
+    category: AnnotationCategory,
+    owner: TibavaUser,
+) -> List[TimelineSegmentAnnotation]:
+    links = [(segment, label_key(label)) for segment, label in links]
+    annotations = resolve_annotations(
+        [label for _, label in links], video=video, category=category, owner=owner
+    )
+    segment_annotations = [
+        TimelineSegmentAnnotation(
+            timeline_segment=segment, annotation=annotations[label]
+        )
+        for segment, label in links
+    ]
+    TimelineSegmentAnnotation.objects.bulk_create(
+        segment_annotations, batch_size=BATCH_SIZE
+    )
+    return segment_annotations
+
+
+def ingest_annotations(
+    timeline: Timeline,
+    annotations: Iterable,
+    video: Video,
+    category: AnnotationCategory,
+    owner: TibavaUser,
+    label_fn: Callable = None,
+) -> List[TimelineSegment]:
+    """
+    Creates a segment for every annotation of an analyser result and links its labels.
+    label_fn maps a label to the annotation name or a (name, color) tuple.
+    """
+    annotations = list(annotations)
+    segments = create_segments(timeline, [(x.start, x.end) for x in annotations])
+
+    links = []
+    for segment, annotation in zip(segments, annotations):
+        for label in annotation.labels:
+            links.append((segment, label_fn(label) if label_fn else label))
+
+    link_annotations(links, video=video, category=category, owner=owner)
+    return segments
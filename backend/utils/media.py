@@ -0,0 +1,125 @@
+import os
+import logging
+import shutil
+import uuid
+
+import ffmpeg
+from django.core.cache import cache
+from django.db import transaction
+
+from backend.models import Video
+from backend.utils import file_hash, media_path_to_video
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_frame_rate(rate: str):
+    try:
+        num, den = rate.split("/")
+        if float(den) == 0:
+            return None
+        return float(num) / float(den)
+    except (AttributeError, ValueError):
+        return None
+
+
+def probe_video(path, digest: str = None):
+    """
+    Reads fps, duration and size from the container header with ffprobe, no frame is
+    decoded. Results are cached by content hash, missing values are None.
+    """
+    key = f"video_probe:{digest}" if digest else None
+    if key is not None:
+        meta = cache.get(key)
+        if meta is not None:
+            return meta
+
+    try:
+        probe = ffmpeg.probe(path)
+    except Exception:
+        logger.exception(f"Probing {path} failed")
+        return {"fps": None, "duration": None, "width": None, "height": None}
+
+    stream = next(
+        (x for x in probe.get("streams", []) if x.get("codec_type") == "video"), {}
+    )
+    duration = probe.get("format", {}).get("duration", stream.get("duration"))
+    meta = {
+        "fps": parse_frame_rate(stream.get("avg_frame_rate"))
+        or parse_frame_rate(stream.get("r_frame_rate")),
+        "duration": float(duration) if duration is not None else None,
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+    }
+    if key is not None and None not in meta.values():
+        cache.set(key, meta)
+    return meta
+
+
+def shared_video_file(digest: str, ext: str):
+    """
+    Returns the file uuid of a stored media file with the given content hash. Has to be
+    called inside a transaction, the referencing video is locked so the file can't be
+    deleted before the new reference is committed.
+    """
+    for video_db in (
+        Video.objects.select_for_update()
+        .filter(file_hash=digest, ext=ext, file__isnull=False)
+        .order_by("date")
+    ):
+        if os.path.exists(media_path_to_video(video_db.file.hex, ext)):
+            return video_db.file
+    return None
+
+
+def create_uploaded_video(
+    path, video_id_uuid: uuid.UUID, name: str, ext: str, user, digest: str = None
+):
+    """
+    Creates the Video entry of a media file. If the same content was stored before, the
+    video points to the existing file and a copy in the media folder is removed,
+    otherwise a file outside of the media folder is copied there. Returns None if the
+    entry already exists.
+    """
+    if digest is None:
+        digest = file_hash(path)
+    meta = probe_video(path, digest)
+    with transaction.atomic():
+        file_uuid = shared_video_file(digest, ext)
+        if file_uuid is None or file_uuid == video_id_uuid:
+            file_uuid = video_id_uuid
+
+        video_db, created = Video.objects.get_or_create(
+            id=video_id_uuid,
+            defaults={
+                "name": name,
+                "file": file_uuid,
+                "file_hash": digest,
+                "ext": ext,
+                "fps": meta["fps"],
+                "duration": meta["duration"],
+                "width": meta["width"],
+                "height": meta["height"],
+                "owner": user,
+            },
+        )
+        if created and None in meta.values():
+            # avoids the import cycle with the plugins
+            from backend.tasks.video_metadata import probe_video_metadata
+
+            transaction.on_commit(
+                lambda: probe_video_metadata.delay(video_id_uuid.hex)
+            )
+    if not created:
+        return None
+
+    target = media_path_to_video(video_id_uuid.hex, ext)
+    if file_uuid != video_id_uuid:
+        logger.info(f"Video {video_id_uuid.hex} shares the media file {file_uuid.hex}")
+        if os.path.exists(target):
+            os.remove(target)
+    elif os.path.abspath(path) != os.path.abspath(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+    return video_db
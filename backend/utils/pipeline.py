@@ -0,0 +1,288 @@
+"""
+Declarative analyser pipelines.
+
+A pipeline is configured in the PIPELINES setting as a DAG of analyser stages and the
+results that should be ingested into the database:
+
+    "pipelines": {
+        "face_emotion": {
+            "parameters": {"fps": {"parser": "float", "default": 2.0}},
+            "nodes": [
+                {
+                    "id": "faces",
+                    "analyser": "insightface_video_detector_torch",
+                    "parameters": {"fps": "$fps"},
+                    "inputs": {"video": "video"},
+                },
+                {
+                    "id": "emotions",
+                    "analyser": "deepface_emotion",
+                    "inputs": {"images": "faces.images", "faces": "faces.faces"},
+                },
+            ],
+            "results": [
+                {"input": "emotions.probs", "type": "scalar_list", "timeline": "Emotion"}
+            ],
+        }
+    }
+
+Inputs reference the uploaded video with "video" and outputs of other nodes with
+"<node>.<output>". Parameter values starting with "$" are taken from the plugin
+parameters. Nodes of several pipelines that run the same analyser with the same
+parameters on the same inputs are merged into one node of a PipelineGraph.
+"""
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from functools import partial
+from typing import Dict, List
+
+from django.conf import settings
+
+from backend.utils.analyser_cache import normalize_parameter
+
+
+logger = logging.getLogger(__name__)
+
+
+VIDEO_INPUT = "video"
+
+RESULT_TYPES = (
+    "scalar",
+    "scalar_list",
+    "hist",
+    "rgb_hist",
+    "shots",
+    "images",
+    "annotations",
+)
+
+
+class PipelineError(Exception):
+    pass
+
+
+def parse_reference(reference: str):
+    if reference == VIDEO_INPUT:
+        return VIDEO_INPUT, None
+    if not isinstance(reference, str) or "." not in reference:
+        raise PipelineError(f"Invalid reference {reference}")
+    node_id, output = reference.split(".", 1)
+    return node_id, output
+
+
+class PipelineNode:
+    def __init__(
+        self, id: str, analyser: str, parameters: Dict = None, inputs: Dict = None
+    ):
+        self.id = id
+        self.analyser = analyser
+        self.parameters = parameters if parameters is not None else {}
+        self.inputs = inputs if inputs is not None else {}
+
+    @classmethod
+    def from_config(cls, config: Dict):
+        return cls(
+            id=config["id"],
+            analyser=config["analyser"],
+            parameters=config.get("parameters"),
+            inputs=config.get("inputs"),
+        )
+
+    def dependencies(self):
+        result = set()
+        for reference in self.inputs.values():
+            node_id, _ = parse_reference(reference)
+            if node_id != VIDEO_INPUT:
+                result.add(node_id)
+        return result
+
+    def resolve_parameters(self, parameters: Dict) -> Dict:
+        result = {}
+        for k, v in self.parameters.items():
+            if isinstance(v, str) and v.startswith("$"):
+                v = parameters.get(v[1:])
+            result[k] = v
+        return result
+
+
+class Pipeline:
+    def __init__(
+        self,
+        name: str,
+        nodes: List[PipelineNode],
+        results: List[Dict] = None,
+        parameters: Dict = None,
+    ):
+        self.name = name
+        self.nodes = {node.id: node for node in nodes}
+        self.results = results if results is not None else []
+        self.parameters = parameters if parameters is not None else {}
+
+        self.validate()
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict):
+        return cls(
+            name=name,
+            nodes=[PipelineNode.from_config(x) for x in config.get("nodes", [])],
+            results=config.get("results"),
+            parameters=config.get("parameters"),
+        )
+
+    def validate(self):
+        for node in self.nodes.values():
+            for dependency in node.dependencies():
+                if dependency not in self.nodes:
+                    raise PipelineError(
+                        f"Pipeline {self.name}: node {node.id} uses unknown node {dependency}"
+                    )
+        for result in self.results:
+            node_id, _ = parse_reference(result.get("input"))
+            if node_id not in self.nodes:
+                raise PipelineError(
+                    f"Pipeline {self.name}: result uses unknown node {node_id}"
+                )
+            if result.get("type") not in RESULT_TYPES:
+                raise PipelineError(
+                    f"Pipeline {self.name}: unknown result type {result.get('type')}"
+                )
+        # raises for cycles
+        self.topological_order()
+
+    def topological_order(self) -> List[PipelineNode]:
+        order = []
+        state = {}
+
+        def visit(node_id):
+            if state.get(node_id) == "done":
+                return
+            if state.get(node_id) == "visiting":
+                raise PipelineError(f"Pipeline {self.name} has a cycle at {node_id}")
+            state[node_id] = "visiting"
+            for dependency in sorted(self.nodes[node_id].dependencies()):
+                visit(dependency)
+            state[node_id] = "done"
+            order.append(self.nodes[node_id])
+
+        for node_id in sorted(self.nodes):
+            visit(node_id)
+        return order
+
+
+class PipelineGraph:
+    """
+    The merged nodes of one or more pipelines for a single video. Nodes are identified by
+    a signature of analyser, parameters and the signatures of their inputs, so shared
+    prefixes of different pipelines are only run once.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.outputs = defaultdict(set)
+        self.downloads = defaultdict(set)
+
+    def add(self, pipeline: Pipeline, parameters: Dict) -> Dict[str, str]:
+        signatures = {}
+        for node in pipeline.topological_order():
+            inputs = {}
+            for name, reference in node.inputs.items():
+                node_id, output = parse_reference(reference)
+                if node_id == VIDEO_INPUT:
+                    inputs[name] = (VIDEO_INPUT, None)
+                else:
+                    inputs[name] = (signatures[node_id], output)
+                    self.outputs[signatures[node_id]].add(output)
+
+            node_parameters = node.resolve_parameters(parameters)
+            signature = hashlib.sha256(
+                json.dumps(
+                    {
+                        "analyser": node.analyser,
+                        "parameters": normalize_parameter(node_parameters),
+                        "inputs": inputs,
+                    },
+                    sort_keys=True,
+                    default=str,
+                ).encode("utf-8")
+            ).hexdigest()
+
+            signatures[node.id] = signature
+            if signature not in self.nodes:
+                self.nodes[signature] = {
+                    "analyser": node.analyser,
+                    "parameters": node_parameters,
+                    "inputs": inputs,
+                }
+
+        for result in pipeline.results:
+            node_id, output = parse_reference(result.get("input"))
+            self.outputs[signatures[node_id]].add(output)
+            self.downloads[signatures[node_id]].add(output)
+
+        return signatures
+
+    def dependencies(self, signature: str):
+        return {
+            dependency
+            for dependency, _ in self.nodes[signature]["inputs"].values()
+            if dependency != VIDEO_INPUT
+        }
+
+    def run(self, task, client, video_id: str) -> Dict:
+        """
+        Runs all nodes with Task.run_analyser. Nodes whose inputs are available are
+        started together, the result maps each signature to the run_analyser result.
+        """
+        results = {}
+        remaining = set(self.nodes)
+        while remaining:
+            ready = sorted(
+                s for s in remaining if self.dependencies(s).issubset(results.keys())
+            )
+            if not ready:
+                raise PipelineError("Pipeline graph has unresolved nodes")
+
+            branches = [
+                partial(self.run_node, task, client, signature, results, video_id)
+                for signature in ready
+            ]
+            for signature, result in zip(ready, task.run_parallel(*branches)):
+                if result is None:
+                    raise PipelineError(
+                        f"Analyser {self.nodes[signature]['analyser']} failed"
+                    )
+                results[signature] = result
+            remaining -= set(ready)
+        return results
+
+    def run_node(self, task, client, signature: str, results: Dict, video_id: str):
+        node = self.nodes[signature]
+        inputs = {}
+        for name, (dependency, output) in node["inputs"].items():
+            if dependency == VIDEO_INPUT:
+                inputs[name] = video_id
+            else:
+                inputs[name] = results[dependency][0][output]
+
+        return task.run_analyser(
+            client,
+            node["analyser"],
+            parameters=node["parameters"],
+            inputs=inputs,
+            outputs=sorted(self.outputs[signature]),
+            downloads=sorted(self.downloads[signature]),
+            stage_key=f"{node['analyser']}:{signature[:16]}",
+        )
+
+
+def load_pipelines() -> Dict[str, Pipeline]:
+    pipelines = {}
+    for name, config in getattr(settings, "PIPELINES", {}).items():
+        try:
+            pipelines[name] = Pipeline.from_config(name, config)
+        except (PipelineError, KeyError):
+            logger.exception(f"Pipeline {name} is not valid and will be ignored")
+    return pipelines
@@ -0,0 +1,66 @@
+import datetime
+import logging
+import uuid
+
+import msgpack
+import msgpack_numpy
+import numpy as np
+from django.http import HttpResponse, JsonResponse
+
+
+logger = logging.getLogger(__name__)
+
+
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+def wants_msgpack(request) -> bool:
+    if request.GET.get("format") == "msgpack":
+        return True
+    return MSGPACK_CONTENT_TYPE in request.headers.get("Accept", "")
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def pack_arrays(value):
+    """
+    Replaces lists of numbers by little-endian float32 arrays, msgpack_numpy sends them
+    as raw buffers instead of one msgpack float per value.
+    """
+    if isinstance(value, dict):
+        return {k: pack_arrays(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(is_number(x) for x in value):
+            return np.asarray(value, dtype="<f4")
+        return [pack_arrays(x) for x in value]
+    return value
+
+
+def encode(obj):
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return obj.hex
+    return msgpack_numpy.encode(obj)
+
+
+def data_response(request, payload: dict, array_keys=("data",)):
+    """
+    Returns the payload as msgpack if the client accepts it and as json otherwise.
+    Numeric lists below the given keys of each entry are sent as float32 buffers.
+    """
+    if not wants_msgpack(request):
+        return JsonResponse(payload)
+
+    def pack_entry(entry):
+        return {k: pack_arrays(v) if k in array_keys else v for k, v in entry.items()}
+
+    payload = dict(payload)
+    if "entries" in payload:
+        payload["entries"] = [pack_entry(x) for x in payload["entries"]]
+    if "entry" in payload:
+        payload["entry"] = pack_entry(payload["entry"])
+    content = msgpack.packb(payload, default=encode, use_bin_type=True)
+    return HttpResponse(content, content_type=MSGPACK_CONTENT_TYPE)
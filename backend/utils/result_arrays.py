@@ -0,0 +1,268 @@
+"""
+Memory-mapped copies of time series results for windowed access.
+
+ScalarData, HistData and RGBData results are written once as plain .npy files to
+DATA_CACHE_ROOT/<result id>/. Requests open them with mmap, find the requested window
+with a binary search on the time array and only read the rows inside of it.
+
+Scalar and histogram results additionally get a pyramid of downsampled levels, each
+LOD_FACTOR times shorter than the previous one and holding the min, max and mean of
+every bucket. A request for a given pixel width is served from the coarsest level that
+still has one sample per pixel.
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+from django.conf import settings
+
+from backend.models import PluginRunResult
+from backend.utils.result_cache import (
+    TMP_PREFIX,
+    array_cache_dir,
+    count,
+    remove_path,
+    touch,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+ARRAY_FIELDS = {
+    "ScalarData": ("y",),
+    "HistData": ("hist",),
+    "RGBData": ("colors",),
+}
+
+LOD_TYPES = ("ScalarData", "HistData")
+LOD_FACTOR = 4
+LOD_MIN_LENGTH = 64
+
+
+def write_lod_levels(output_dir: str, time: np.ndarray, arrays: Dict) -> List[Dict]:
+    levels = []
+    factor = LOD_FACTOR
+    while len(time) // factor >= LOD_MIN_LENGTH:
+        level = len(levels) + 1
+        idx = np.arange(0, len(time), factor)
+        counts = np.diff(np.append(idx, len(time))).astype(np.float64)
+
+        np.save(os.path.join(output_dir, f"lod{level}_time.npy"), time[idx])
+        for field, values in arrays.items():
+            values = values.astype(np.float64)
+            shape = (-1,) + (1,) * (values.ndim - 1)
+            stats = {
+                "min": np.minimum.reduceat(values, idx, axis=0),
+                "max": np.maximum.reduceat(values, idx, axis=0),
+                "mean": np.add.reduceat(values, idx, axis=0) / counts.reshape(shape),
+            }
+            for stat, x in stats.items():
+                np.save(
+                    os.path.join(output_dir, f"lod{level}_{field}_{stat}.npy"),
+                    x.astype(np.float32),
+                )
+
+        levels.append({"factor": factor, "length": len(idx)})
+        factor *= LOD_FACTOR
+    return levels
+
+
+def write_result_arrays(plugin_run_result_id, data) -> bool:
+    """
+    Stores the time series of an opened data object. The files are written to a
+    temporary directory first, readers never see a partial cache entry.
+    """
+    fields = ARRAY_FIELDS.get(data.type)
+    if fields is None:
+        return False
+
+    output_dir = array_cache_dir(plugin_run_result_id)
+    if os.path.exists(os.path.join(output_dir, "meta.json")):
+        return True
+
+    os.makedirs(settings.DATA_CACHE_ROOT, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=settings.DATA_CACHE_ROOT, prefix=TMP_PREFIX)
+    try:
+        time = np.asarray(data.time, dtype=np.float64)
+        np.save(os.path.join(tmp_dir, "time.npy"), time)
+        arrays = {}
+        for field in fields:
+            values = np.asarray(getattr(data, field))
+            if len(values) != len(time):
+                logger.error(
+                    f"Length of {field} does not match time ({plugin_run_result_id})"
+                )
+                return False
+            np.save(os.path.join(tmp_dir, f"{field}.npy"), values)
+            arrays[field] = values
+
+        levels = []
+        if data.type in LOD_TYPES:
+            levels = write_lod_levels(tmp_dir, time, arrays)
+
+        delta_time = getattr(data, "delta_time", None)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "type": data.type,
+                    "fields": list(fields),
+                    "delta_time": None if delta_time is None else float(delta_time),
+                    "levels": levels,
+                },
+                f,
+            )
+
+        try:
+            os.rename(tmp_dir, output_dir)
+        except OSError:
+            # another worker was faster
+            pass
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return True
+
+
+def load_result_arrays(plugin_run_result: PluginRunResult, data_manager) -> Dict:
+    """
+    Opens the cached arrays of a result memory-mapped and creates them from the
+    data manager on first access. Returns None for results without a time series.
+    """
+    cache_dir = array_cache_dir(plugin_run_result.id)
+    if os.path.exists(os.path.join(cache_dir, "meta.json")):
+        result_arrays = open_result_arrays(cache_dir)
+        if result_arrays is not None:
+            count("hit")
+            return result_arrays
+        logger.warning(f"Removing corrupt cache entry {cache_dir}")
+        remove_path(cache_dir)
+        count("corrupt")
+
+    count("miss")
+    data = data_manager.load(plugin_run_result.data_id)
+    if data is None:
+        return None
+    with data:
+        if not write_result_arrays(plugin_run_result.id, data):
+            return None
+    return open_result_arrays(cache_dir)
+
+
+def open_result_arrays(cache_dir: str) -> Dict:
+    meta_path = os.path.join(cache_dir, "meta.json")
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+
+        result_arrays = {
+            **meta,
+            "levels": meta.get("levels", []),
+            "cache_dir": cache_dir,
+            "time": np.load(os.path.join(cache_dir, "time.npy"), mmap_mode="r"),
+            "arrays": {
+                field: np.load(os.path.join(cache_dir, f"{field}.npy"), mmap_mode="r")
+                for field in meta["fields"]
+            },
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+
+    touch(meta_path)
+    return result_arrays
+
+
+def find_window(time: np.ndarray, start: float = None, end: float = None):
+    lo = 0 if start is None else int(np.searchsorted(time, start, side="left"))
+    hi = len(time) if end is None else int(np.searchsorted(time, end, side="right"))
+    return lo, max(lo, hi)
+
+
+def slice_lod_level(
+    result_arrays: Dict, start: float = None, end: float = None, width: int = None
+) -> Dict:
+    """
+    Returns the min, max and mean of the coarsest level with at least width buckets in
+    the window, or None if the raw samples should be used.
+    """
+    lo, hi = find_window(result_arrays["time"], start, end)
+
+    level = None
+    for i, x in enumerate(result_arrays["levels"]):
+        if (hi - lo) // x["factor"] >= width:
+            level = i + 1
+    if level is None:
+        return None
+
+    def load(name):
+        return np.load(
+            os.path.join(result_arrays["cache_dir"], f"lod{level}_{name}.npy"),
+            mmap_mode="r",
+        )
+
+    time = load("time")
+    # the bucket containing start is part of the window
+    lo = 0 if start is None else max(0, int(np.searchsorted(time, start, "right")) - 1)
+    hi = len(time) if end is None else int(np.searchsorted(time, end, "right"))
+    hi = max(lo, hi)
+
+    factor = result_arrays["levels"][level - 1]["factor"]
+    delta_time = result_arrays["delta_time"]
+    result = {
+        "type": result_arrays["type"],
+        "delta_time": None if delta_time is None else delta_time * factor,
+        "time": np.asarray(time[lo:hi]).tolist(),
+        "level": level,
+        "factor": factor,
+        "offset": lo,
+        "total": len(time),
+    }
+    for field in result_arrays["arrays"]:
+        result[field] = np.asarray(load(f"{field}_mean")[lo:hi]).tolist()
+        result[f"{field}_min"] = np.asarray(load(f"{field}_min")[lo:hi]).tolist()
+        result[f"{field}_max"] = np.asarray(load(f"{field}_max")[lo:hi]).tolist()
+    return result
+
+
+def slice_result_arrays(
+    result_arrays: Dict,
+    start: float = None,
+    end: float = None,
+    max_points: int = None,
+    width: int = None,
+) -> Dict:
+    """
+    Returns all samples with start <= time <= end. With a pixel width the window is
+    served from the matching pyramid level. If there are more than max_points samples,
+    every n-th sample is returned.
+    """
+    if width is not None and width > 0:
+        result = slice_lod_level(result_arrays, start=start, end=end, width=width)
+        if result is not None:
+            return result
+
+    time = result_arrays["time"]
+    lo, hi = find_window(time, start, end)
+
+    step = 1
+    if max_points is not None and max_points > 0 and hi - lo > max_points:
+        step = -(-(hi - lo) // max_points)
+
+    result = {
+        "type": result_arrays["type"],
+        "delta_time": result_arrays["delta_time"],
+        "time": np.asarray(time[lo:hi:step]).tolist(),
+        "level": 0,
+        "factor": 1,
+        "offset": lo,
+        "step": step,
+        "total": len(time),
+    }
+    for field, values in result_arrays["arrays"].items():
+        result[field] = np.asarray(values[lo:hi:step]).tolist()
+    return result
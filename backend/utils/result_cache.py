@@ -0,0 +1,201 @@
+"""
+File cache of plugin results under DATA_CACHE_ROOT.
+
+Every result owns <id>.json and the array directory <id>/. Files are written under a
+temporary name and renamed into place, so a crashed write never leaves a partial entry
+behind. Reads touch the entry, its mtime is the last access. Once the cache exceeds
+DATA_CACHE_MAX_SIZE the evict_result_cache task removes the least recently used
+results. Hit, miss, corrupt
+and eviction counters are kept in the django cache shared by all workers.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+TMP_PREFIX = ".tmp_"
+# temporary files older than this belong to crashed writes (seconds)
+TMP_MAX_AGE = 60 * 60
+
+COUNTERS = ("hit", "miss", "corrupt", "evicted")
+
+
+def json_cache_path(plugin_run_result_id) -> str:
+    return os.path.join(settings.DATA_CACHE_ROOT, f"{plugin_run_result_id}.json")
+
+
+def array_cache_dir(plugin_run_result_id) -> str:
+    return os.path.join(settings.DATA_CACHE_ROOT, f"{plugin_run_result_id}")
+
+
+def count(name: str, n: int = 1) -> None:
+    key = f"result_cache:{name}"
+    try:
+        if not cache.add(key, n, timeout=None):
+            cache.incr(key, n)
+    except Exception:
+        logger.debug(f"Result cache counter {name} not updated")
+
+
+def cache_stats() -> Dict[str, int]:
+    try:
+        values = cache.get_many([f"result_cache:{x}" for x in COUNTERS])
+    except Exception:
+        values = {}
+    return {x: values.get(f"result_cache:{x}", 0) for x in COUNTERS}
+
+
+def touch(path: str) -> None:
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def read_result(plugin_run_result_id) -> Dict:
+    """
+    Returns the cached result or None. Unreadable entries are removed and count as
+    a miss.
+    """
+    path = json_cache_path(plugin_run_result_id)
+    try:
+        with open(path, "r") as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        count("miss")
+        return None
+    except (OSError, ValueError):
+        logger.warning(f"Removing corrupt cache entry {path}")
+        remove_path(path)
+        count("corrupt")
+        count("miss")
+        return None
+
+    touch(path)
+    count("hit")
+    return result
+
+
+def write_result(plugin_run_result_id, result: Dict) -> None:
+    os.makedirs(settings.DATA_CACHE_ROOT, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=settings.DATA_CACHE_ROOT, prefix=TMP_PREFIX, suffix=".json"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(result, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, json_cache_path(plugin_run_result_id))
+    except Exception:
+        remove_path(tmp_path)
+        raise
+
+
+def remove_path(path: str) -> int:
+    """
+    Removes a file or directory and returns the number of bytes freed.
+    """
+    size = path_size(path)
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+def path_size(path: str) -> int:
+    try:
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+        size = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                size += os.path.getsize(os.path.join(root, name))
+        return size
+    except OSError:
+        return 0
+
+
+def delete_result(plugin_run_result_id) -> None:
+    remove_path(json_cache_path(plugin_run_result_id))
+    remove_path(array_cache_dir(plugin_run_result_id))
+
+
+def cache_entries() -> List[Dict]:
+    """
+    Lists the cached results with their size and last access. Temporary files of
+    crashed writes are removed on the way.
+    """
+    entries = {}
+    if not os.path.isdir(settings.DATA_CACHE_ROOT):
+        return []
+
+    now = time.time()
+    with os.scandir(settings.DATA_CACHE_ROOT) as it:
+        for x in it:
+            try:
+                mtime = x.stat().st_mtime
+            except OSError:
+                continue
+
+            if x.name.startswith(TMP_PREFIX):
+                if now - mtime > TMP_MAX_AGE:
+                    remove_path(x.path)
+                continue
+
+            if x.is_dir():
+                meta_path = os.path.join(x.path, "meta.json")
+                if os.path.exists(meta_path):
+                    mtime = os.path.getmtime(meta_path)
+                key = x.name
+            elif x.name.endswith(".json"):
+                key = x.name[: -len(".json")]
+            else:
+                continue
+
+            entry = entries.setdefault(key, {"id": key, "size": 0, "paths": []})
+            entry["size"] += path_size(x.path)
+            entry["paths"].append(x.path)
+            entry["last_access"] = max(entry.get("last_access", 0), mtime)
+
+    return list(entries.values())
+
+
+def evict(max_size: int = None) -> Dict[str, int]:
+    """
+    Removes the least recently used results until the cache fits into max_size bytes.
+    """
+    if max_size is None:
+        max_size = settings.DATA_CACHE_MAX_SIZE
+
+    entries = sorted(cache_entries(), key=lambda x: x["last_access"])
+    total = sum(x["size"] for x in entries)
+    removed = 0
+    freed = 0
+    for entry in entries:
+        if max_size is None or total <= max_size:
+            break
+        for path in entry["paths"]:
+            freed += remove_path(path)
+        total -= entry["size"]
+        removed += 1
+
+    if removed:
+        count("evicted", removed)
+        logger.info(f"Evicted {removed} results ({freed} bytes) from the result cache")
+    return {"removed": removed, "freed": freed, "size": total}
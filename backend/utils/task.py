@@ -1,27 +1,140 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-from typing import Dict, List
+from typing import Callable, Dict, List
 
-from ..utils.analyser_client import TaskAnalyserClient
+from django.conf import settings
+from django.db import connection, connections
 
-from backend.models import PluginRun, PluginRunResult, Video, Timeline
-from backend.utils import media_path_to_video
+from analyser.proto import analyser_pb2
+
+from ..utils.analyser_client import (
+    TaskAnalyserClient,
+    analyser_status_to_task_status,
+    raise_if_canceled,
+)
+
+from backend.models import (
+    AnalyserUpload,
+    PluginRun,
+    PluginRunResult,
+    PluginRunStage,
+    Video,
+    Timeline,
+)
+from backend.utils import media_path_to_video, file_hash
+from backend.utils.analyser_cache import (
+    analyser_cache_key,
+    load_analyser_cache,
+    normalize_parameter,
+    store_analyser_cache,
+)
 
 
 logger = logging.getLogger(__name__)
 
 
+class AnalyserJobPending(Exception):
+    """
+    Raised by a non-blocking task when an analyser job is submitted but not finished.
+    The plugin is replayed by run_plugin once all jobs are done.
+    """
+
+    def __init__(self, job_ids: List[str]):
+        super().__init__(f"Waiting for analyser jobs {job_ids}")
+        self.job_ids = job_ids
+
+
 class Task:
+    # if False, run_analyser raises AnalyserJobPending instead of waiting for the job
+    blocking = True
+    # set for the replays of a plugin run after its pending analyser jobs finished
+    replay = False
+    _stage_lock = threading.Lock()
+
     def __init__(self):
         pass
 
     def __call__(self):
         pass
 
+    def next_stage_key(self, analyser: str) -> str:
+        with self._stage_lock:
+            if not hasattr(self, "_stage_counts"):
+                self._stage_counts = {}
+            index = self._stage_counts.get(analyser, 0)
+            self._stage_counts[analyser] = index + 1
+        return f"{analyser}:{index}"
+
+    def run_parallel(self, *branches: Callable) -> List:
+        """
+        Runs independent branches of a plugin concurrently and returns their results in
+        the given order. Pending analyser jobs of all branches are collected before
+        AnalyserJobPending is raised, so the analyser works on them at the same time.
+        Branches should not call the same analyser, otherwise the stage keys of a replay
+        depend on thread timing.
+        """
+        with ThreadPoolExecutor(max_workers=max(len(branches), 1)) as executor:
+            futures = [executor.submit(self._run_branch, branch) for branch in branches]
+
+        results = []
+        pending_job_ids = []
+        error = None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except AnalyserJobPending as pending:
+                pending_job_ids.extend(pending.job_ids)
+                results.append(None)
+            except Exception as e:
+                if error is None:
+                    error = e
+                results.append(None)
+
+        if error is not None:
+            raise error
+        if pending_job_ids:
+            raise AnalyserJobPending(pending_job_ids)
+        return results
+
+    @staticmethod
+    def _run_branch(branch: Callable):
+        try:
+            return branch()
+        finally:
+            # every thread opens its own database connection
+            connections.close_all()
+
     def upload_video(self, client: TaskAnalyserClient, video: Video) -> str:
         video_file = media_path_to_video(video.file.hex, video.ext)
 
+        if not video.file_hash:
+            video.file_hash = file_hash(video_file)
+            Video.objects.filter(id=video.id).update(file_hash=video.file_hash)
+
+        # reuse the data of a previous upload as long as the analyser still knows it
+        upload_db = AnalyserUpload.objects.filter(
+            file_hash=video.file_hash, host=str(client.host), port=str(client.port)
+        ).first()
+        if upload_db is not None:
+            if client.check_data(upload_db.data_id):
+                logger.info(
+                    f"Reusing uploaded video {video.id.hex} with data_id {upload_db.data_id}"
+                )
+                upload_db.save(update_fields=["last_used"])
+                return upload_db.data_id
+            upload_db.delete()
+
         data_id = client.upload_file(video_file)
+        if data_id is not None:
+            AnalyserUpload.objects.update_or_create(
+                file_hash=video.file_hash,
+                host=str(client.host),
+                port=str(client.port),
+                defaults={"data_id": data_id},
+            )
         return data_id
 
     def run_analyser(
@@ -33,6 +146,8 @@ class Task:
         outputs: List = None,
         downloads: List = None,
         plugin_run: PluginRun = None,
+        cache: bool = True,
+        stage_key: str = None,
     ) -> str:
 
         if parameters is None:
@@ -44,34 +159,203 @@ class Task:
         if downloads is None:
             downloads = []
 
-        job_id = client.run_plugin(
-            analyser,
-            [{"name": k, "id": v} for k, v in inputs.items()],
-            [{"name": k, "value": v} for k, v in parameters.items()],
-        )
-        if job_id is None:
-            return None
-        logger.info(
-            f"Plugin started: analyser job_id: {job_id} plugin_run_id: {plugin_run}"
-        )
+        if plugin_run is None:
+            plugin_run = client.plugin_run_db
 
-        result = client.get_plugin_results(job_id=job_id, plugin_run_db=plugin_run)
-        if result is None:
-            logger.error(
-                f"Plugin is crashing: analyser job_id: {job_id} plugin_run_id: {plugin_run}"
+        stage_db = None
+        result_outputs = None
+        if plugin_run is not None:
+            stage_db, created = PluginRunStage.objects.get_or_create(
+                plugin_run=plugin_run,
+                key=stage_key if stage_key else self.next_stage_key(analyser),
+                defaults={
+                    "analyser": analyser,
+                    "parameters": parameters,
+                    "inputs": inputs,
+                },
             )
-            return None
+            if not created and not self.stage_reusable(
+                client, stage_db, parameters, inputs, outputs, downloads
+            ):
+                logger.info(f"Stage {stage_db.key} of {plugin_run} has to run again")
+                stage_db.parameters = parameters
+                stage_db.inputs = inputs
+                stage_db.job_id = None
+                stage_db.status = PluginRun.STATUS_QUEUED
+                stage_db.save(
+                    update_fields=["parameters", "inputs", "job_id", "status", "update_date"]
+                )
+            if stage_db.status == PluginRun.STATUS_DONE:
+                result_outputs = stage_db.outputs
+
+        if result_outputs is None and cache:
+            cache_key = analyser_cache_key(client, analyser, inputs, parameters)
+            result_outputs = load_analyser_cache(
+                client, cache_key, required=outputs + downloads
+            )
+            if result_outputs is not None:
+                logger.info(
+                    f"Reusing cached outputs of {analyser} plugin_run_id: {plugin_run}"
+                )
+
+        if result_outputs is None:
+            raise_if_canceled(plugin_run)
+            if stage_db is not None and stage_db.job_id:
+                job_id = stage_db.job_id
+            else:
+                job_id = client.run_plugin(
+                    analyser,
+                    [{"name": k, "id": v} for k, v in inputs.items()],
+                    [{"name": k, "value": v} for k, v in parameters.items()],
+                )
+                if job_id is None:
+                    return None
+                logger.info(
+                    f"Plugin started: analyser job_id: {job_id} plugin_run_id: {plugin_run}"
+                )
+                if stage_db is not None:
+                    stage_db.job_id = job_id
+                    stage_db.save(update_fields=["job_id", "update_date"])
+
+            # stages inside a transaction would lose their job id on rollback, so wait there
+            if self.blocking or stage_db is None or connection.in_atomic_block:
+                result = client.get_plugin_results(job_id=job_id, plugin_run_db=plugin_run)
+            else:
+                result = self.check_analyser_job(client, job_id, stage_db)
+
+            if result is None:
+                logger.error(
+                    f"Plugin is crashing: analyser job_id: {job_id} plugin_run_id: {plugin_run}"
+                )
+                if stage_db is not None:
+                    stage_db.status = PluginRun.STATUS_ERROR
+                    stage_db.save(update_fields=["status", "update_date"])
+                return None
+
+            result_outputs = {output.name: output.id for output in result.outputs}
+            if cache:
+                store_analyser_cache(client, cache_key, analyser, result_outputs)
+
+        if stage_db is not None and stage_db.status != PluginRun.STATUS_DONE:
+            stage_db.outputs = result_outputs
+            stage_db.status = PluginRun.STATUS_DONE
+            stage_db.save(update_fields=["outputs", "status", "update_date"])
 
         result_ids = {}
-        for output in result.outputs:
-            if output.name in outputs:
-                result_ids[output.name] = output.id
+        for name, data_id in result_outputs.items():
+            if name in outputs:
+                result_ids[name] = data_id
 
-        download_data = {}
-        for output in result.outputs:
-            if output.name in downloads:
+        # nothing is fetched for runs that were canceled while the job was running
+        raise_if_canceled(plugin_run)
 
-                data = client.download_data(output.id)
-                download_data[output.name] = data
+        download_data = self.download_outputs(
+            client,
+            {
+                name: data_id
+                for name, data_id in result_outputs.items()
+                if name in downloads
+            },
+        )
 
         return result_ids, download_data
+
+    def download_outputs(self, client: TaskAnalyserClient, data_ids: Dict) -> Dict:
+        """
+        Downloads the outputs of an analyser job concurrently. Data that is already in
+        the local store of the client, e.g. from an earlier run, is not downloaded again.
+        """
+        download_data = {}
+        missing = {}
+        manager = getattr(client, "manager", None)
+        for name, data_id in data_ids.items():
+            data = None
+            if manager is not None:
+                try:
+                    data = manager.load(data_id)
+                except Exception:
+                    logger.warning(f"Stored data {data_id} is not readable, downloading it")
+            if data is not None:
+                download_data[name] = data
+            else:
+                missing[name] = data_id
+
+        if len(missing) <= 1:
+            for name, data_id in missing.items():
+                download_data[name] = client.download_data(data_id)
+            return download_data
+
+        max_workers = min(len(missing), getattr(settings, "ANALYSER_DOWNLOAD_WORKERS", 4))
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            futures = {
+                name: executor.submit(
+                    self._run_branch, partial(client.download_data, data_id)
+                )
+                for name, data_id in missing.items()
+            }
+        for name, future in futures.items():
+            download_data[name] = future.result()
+        return download_data
+
+    def stage_reusable(
+        self,
+        client: TaskAnalyserClient,
+        stage_db: PluginRunStage,
+        parameters: Dict,
+        inputs: Dict,
+        outputs: List,
+        downloads: List,
+    ) -> bool:
+        """
+        Checks if a stage can be used again. Pending jobs and the stages of replays are
+        matched by key, plugins that upload local data before a stage get a new data id
+        on every replay. Finished stages of an earlier attempt also need the same inputs
+        and every required output has to exist on the analyser, outputs that are only
+        downloaded may also be in the local store. Failed or canceled stages run again.
+        """
+        if stage_db.status in (PluginRun.STATUS_ERROR, PluginRun.STATUS_CANCELED):
+            return False
+        if normalize_parameter(stage_db.parameters) != normalize_parameter(parameters):
+            return False
+        if stage_db.status != PluginRun.STATUS_DONE:
+            return True
+        if self.replay:
+            return True
+        if stage_db.inputs != inputs:
+            return False
+
+        manager = getattr(client, "manager", None)
+        for name in set(outputs + downloads):
+            data_id = stage_db.outputs.get(name)
+            if data_id is None:
+                return False
+            if client.check_data(data_id):
+                continue
+            if (
+                name not in outputs
+                and manager is not None
+                and manager.load(data_id) is not None
+            ):
+                continue
+            return False
+        return True
+
+    def check_analyser_job(
+        self, client: TaskAnalyserClient, job_id: str, stage_db: PluginRunStage
+    ):
+        result = client.get_plugin_status(job_id)
+        if result is None:
+            return None
+
+        if result.status == analyser_pb2.GetPluginStatusResponse.DONE:
+            return result
+
+        status = analyser_status_to_task_status(result.status)
+        if status is None or status == PluginRun.STATUS_ERROR:
+            logger.error(f"Job {job_id} is crashing or unknown by the analyser")
+            return None
+
+        if stage_db.status != status:
+            stage_db.status = status
+            stage_db.save(update_fields=["status", "update_date"])
+        raise AnalyserJobPending([job_id])
@@ -19,7 +19,8 @@ class ClusterItemFetch(View):
 
             entries = [
                 item.to_dict()
-                for item in ClusterItem.objects.filter(video_id=request.GET.get('video_id'))
+                for item in ClusterItem.objects.filter(video_id=request.GET.get('video_id'), video__deleted=False)
+                                               .exclude(plugin_run_result__plugin_run__deleted=True)
             ]
 
             return JsonResponse({"status": "ok", "entries": entries})
@@ -26,6 +26,7 @@ class PluginList(View):
                 analyses = PluginRun.objects.filter(video=video_db)
             else:
                 analyses = PluginRun.objects.all()
+            analyses = analyses.filter(video__deleted=False)
 
             add_results = request.GET.get("add_results")
             if add_results:
@@ -10,6 +10,7 @@ import tempfile
 from pathlib import Path
 import tempfile
 import time
+from datetime import timedelta
 
 from urllib.parse import urlparse
 import imageio
@@ -21,11 +22,16 @@ from backend.utils import download_url, download_file, media_url_to_video
 from django.views import View
 from django.http import HttpResponse, JsonResponse
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db import connection
+from django.db.models import Q
 
 # from django.core.exceptions import BadRequest
 
-from backend.models import Video, PluginRun
+from backend.models import Video, PluginRun, Timeline
 from backend.plugin_manager import PluginManager
+from backend.tasks.deletion import purge_deleted
 
 
 logger = logging.getLogger(__name__)
@@ -133,6 +139,84 @@ class PluginRunNew(View):
             return JsonResponse({"status": "error"})
 
 
+class PluginRunBatchNew(View):
+    def post(self, request):
+        try:
+            if not request.user.is_authenticated:
+                logger.error("PluginRunBatchNew::not_authenticated")
+                return JsonResponse({"status": "error"})
+
+            try:
+                body = request.body.decode("utf-8")
+            except (UnicodeDecodeError, AttributeError):
+                body = request.body
+
+            try:
+                data = json.loads(body)
+            except Exception as e:
+                return JsonResponse({"status": "error"})
+
+            video_ids = data.get("video_ids")
+            plugins = data.get("plugins")
+            if not video_ids or not plugins:
+                return JsonResponse({"status": "error", "type": "missing_values"})
+
+            if not isinstance(video_ids, list) or not isinstance(plugins, list):
+                return JsonResponse({"status": "error", "type": "wrong_request_body"})
+
+            valid_plugins = []
+            for plugin in plugins:
+                if not isinstance(plugin, dict) or "plugin" not in plugin:
+                    return JsonResponse(
+                        {"status": "error", "type": "wrong_request_body"}
+                    )
+                parameters = plugin.get("parameters", [])
+                if not isinstance(parameters, list):
+                    return JsonResponse(
+                        {"status": "error", "type": "wrong_request_body"}
+                    )
+                for parameter in parameters:
+                    if (
+                        not isinstance(parameter, dict)
+                        or "name" not in parameter
+                        or "value" not in parameter
+                    ):
+                        return JsonResponse(
+                            {"status": "error", "type": "wrong_request_body"}
+                        )
+                valid_plugins.append(
+                    {
+                        "plugin": plugin.get("plugin"),
+                        "parameters": [
+                            {"name": x.get("name"), "value": x.get("value")}
+                            for x in parameters
+                        ],
+                    }
+                )
+
+            videos_db = list(
+                Video.objects.filter(id__in=video_ids, owner=request.user)
+            )
+            if len(videos_db) != len(set(video_ids)):
+                return JsonResponse({"status": "error", "type": "not_exist"})
+
+            plugin_manager = PluginManager()
+            result = plugin_manager.submit_batch(
+                videos=videos_db, plugins=valid_plugins, user=request.user
+            )
+            if not result.get("status"):
+                return JsonResponse(
+                    {"status": "error", "type": result.get("type", "plugin_not_started")}
+                )
+
+            return JsonResponse(
+                {"status": "ok", "plugin_run_ids": result.get("plugin_runs")}
+            )
+        except Exception:
+            logger.exception("Failed to create new plugin runs")
+            return JsonResponse({"status": "error"})
+
+
 class PluginRunDelete(View):
     def post(self, request):
         try:
@@ -159,18 +243,181 @@ class PluginRunDelete(View):
                     {"status": "error", "type": "missing_values_plugin_list"}
                 )
 
-            plugins_to_be_deleted = [
-                PluginRun.objects.get(id=p) for p in list(data.get("plugin_list"))
-            ]
-            for p in plugins_to_be_deleted:
-                response = p.delete()
+            plugin_runs_db = PluginRun.objects.filter(
+                id__in=list(data.get("plugin_list")), video__owner=request.user
+            )
+            PluginManager().cancel(plugin_runs_db)
 
-            return JsonResponse({"status": "ok", "deleted_items": response})
+            # the runs are hidden right away, their results are removed in the background
+            count = plugin_runs_db.update(deleted=True, update_date=timezone.now())
+            if count:
+                purge_deleted.delay()
+
+            return JsonResponse({"status": "ok", "deleted_items": count})
         except Exception:
             logger.exception("Failed to delete PluginRun")
             return JsonResponse({"status": "error"})
 
 
+class PluginRunCancel(View):
+    def post(self, request):
+        try:
+            if not request.user.is_authenticated:
+                logger.error("PluginRunCancel::not_authenticated")
+                return JsonResponse({"status": "error"})
+
+            try:
+                body = request.body.decode("utf-8")
+            except (UnicodeDecodeError, AttributeError):
+                body = request.body
+
+            try:
+                data = json.loads(body)
+            except Exception as e:
+                return JsonResponse({"status": "error"})
+
+            if "plugin_list" not in data:
+                return JsonResponse(
+                    {"status": "error", "type": "missing_values_plugin_list"}
+                )
+
+            plugin_runs_db = PluginRun.objects.filter(
+                id__in=list(data.get("plugin_list")), video__owner=request.user
+            )
+
+            plugin_manager = PluginManager()
+            canceled = plugin_manager.cancel(plugin_runs_db)
+
+            return JsonResponse({"status": "ok", "canceled_items": canceled})
+        except Exception:
+            logger.exception("Failed to cancel PluginRun")
+            return JsonResponse({"status": "error"})
+
+
+class PluginRunResume(View):
+    def post(self, request):
+        try:
+            if not request.user.is_authenticated:
+                logger.error("PluginRunResume::not_authenticated")
+                return JsonResponse({"status": "error"})
+
+            try:
+                body = request.body.decode("utf-8")
+            except (UnicodeDecodeError, AttributeError):
+                body = request.body
+
+            try:
+                data = json.loads(body)
+            except Exception as e:
+                return JsonResponse({"status": "error"})
+
+            if "plugin_list" not in data:
+                return JsonResponse(
+                    {"status": "error", "type": "missing_values_plugin_list"}
+                )
+
+            plugin_runs_db = PluginRun.objects.filter(
+                id__in=list(data.get("plugin_list")), video__owner=request.user
+            )
+
+            plugin_manager = PluginManager()
+            resumed = plugin_manager.resume(plugin_runs_db)
+
+            return JsonResponse({"status": "ok", "resumed_items": resumed})
+        except Exception:
+            logger.exception("Failed to resume PluginRun")
+            return JsonResponse({"status": "error"})
+
+
+class PluginRunChanges(View):
+    """
+    Long-poll for plugin run changes and new timelines. Without a cursor everything is
+    returned at once, with the cursor of the last response the request waits up to
+    PLUGIN_RUN_CHANGES_TIMEOUT seconds until something changed after it. The request
+    holds its worker while it waits, the server runs gevent workers for this reason.
+    The database connection is closed while it sleeps.
+    Deleted runs are listed by id until they are purged.
+
+    update_date and Timeline.date are set before their transaction commits, a change can
+    become visible after a later one. The cursor therefore lags PLUGIN_RUN_CHANGES_MARGIN
+    seconds behind the response and the same entries can be returned more than once,
+    clients replace them by id.
+    """
+
+    def get(self, request):
+        if not request.user.is_authenticated:
+            logger.error("PluginRunChanges::not_authenticated")
+            return JsonResponse({"status": "error"})
+
+        try:
+            since = None
+            cursor = request.GET.get("cursor")
+            if cursor:
+                since = parse_datetime(cursor)
+                if since is None:
+                    return JsonResponse({"status": "error", "type": "wrong_request_body"})
+
+            plugin_runs = PluginRun.objects.filter(
+                video__owner=request.user, video__deleted=False
+            )
+            deleted_runs = PluginRun.all_objects.filter(video__owner=request.user).filter(
+                Q(deleted=True) | Q(video__deleted=True)
+            )
+            timelines = Timeline.objects.filter(
+                video__owner=request.user, video__deleted=False
+            ).exclude(plugin_run_result__plugin_run__deleted=True)
+            video_id = request.GET.get("video_id")
+            if video_id:
+                plugin_runs = plugin_runs.filter(video__id=video_id)
+                deleted_runs = deleted_runs.filter(video__id=video_id)
+                timelines = timelines.filter(video__id=video_id)
+
+            margin = timedelta(seconds=getattr(settings, "PLUGIN_RUN_CHANGES_MARGIN", 30))
+            deadline = time.time() + getattr(settings, "PLUGIN_RUN_CHANGES_TIMEOUT", 25)
+            while True:
+                # taken before the queries so no change between them and the cursor is lost
+                now = timezone.now()
+                if since is None:
+                    deleted_runs = deleted_runs.none()
+                    break
+                # entries up to the last response were returned already, only later ones
+                # end the wait. Late commits come with the next response.
+                last_response = since + margin
+                if time.time() >= deadline or (
+                    plugin_runs.filter(update_date__gt=last_response).exists()
+                    or deleted_runs.filter(update_date__gt=last_response).exists()
+                    or timelines.filter(date__gt=last_response).exists()
+                ):
+                    plugin_runs = plugin_runs.filter(update_date__gt=since)
+                    deleted_runs = deleted_runs.filter(update_date__gt=since)
+                    timelines = timelines.filter(date__gt=since)
+                    break
+                # don't hold a database connection per waiting request
+                connection.close()
+                time.sleep(getattr(settings, "PLUGIN_RUN_CHANGES_INTERVAL", 1))
+
+            return JsonResponse(
+                {
+                    "status": "ok",
+                    "cursor": (now - margin).isoformat(),
+                    "plugin_runs": [
+                        x.to_dict() for x in plugin_runs.select_related("video")
+                    ],
+                    "deleted_plugin_runs": [
+                        x.hex for x in deleted_runs.values_list("id", flat=True)
+                    ],
+                    "timelines": [
+                        x.to_dict()
+                        for x in timelines.select_related("video", "parent")
+                        .prefetch_related("timelinesegment_set")
+                    ],
+                }
+            )
+        except Exception:
+            logger.exception("Failed to list plugin run changes")
+            return JsonResponse({"status": "error"})
+
+
 class PluginRunList(View):
     def get(self, request):
 
@@ -184,10 +431,12 @@ class PluginRunList(View):
             video_id = request.GET.get("video_id")
             if video_id:
                 analyses = PluginRun.objects.filter(
-                    video__id=video_id, video__owner=request.user
+                    video__id=video_id, video__owner=request.user, video__deleted=False
                 )
             else:
-                analyses = PluginRun.objects.filter(video__owner=request.user)
+                analyses = PluginRun.objects.filter(
+                    video__owner=request.user, video__deleted=False
+                )
             # print(len(analyses), flush=True)
             add_results = request.GET.get("add_results")
 
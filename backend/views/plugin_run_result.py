@@ -11,12 +11,18 @@ from django.conf import settings
 
 from backend.models import PluginRunResult, Video, PluginRun
 from backend.plugin_manager import PluginManager
+from backend.utils.response import data_response
+from backend.utils.result_arrays import load_result_arrays, slice_result_arrays
+from backend.utils.result_cache import read_result, write_result
 from analyser.data import DataManager
 
 
 logger = logging.getLogger(__name__)
 
 
+LOD_RESULT_TYPES = (PluginRunResult.TYPE_SCALAR, PluginRunResult.TYPE_HIST)
+
+
 class PluginRunResultList(View):
     def get(self, request):
         start_time = time.time()
@@ -49,30 +55,34 @@ class PluginRunResultList(View):
 
                 query_dict["plugin_run"] = plugin_run_db
 
-            analyses = PluginRunResult.objects.filter(**query_dict)
+            # runs and videos marked as deleted wait for purge_deleted
+            analyses = PluginRunResult.objects.filter(
+                **query_dict,
+                plugin_run__deleted=False,
+                plugin_run__video__deleted=False,
+            )
             # print("PluginRunResultList")
             # for x in analyses:
             #     print(f"\t {x.id.hex}")
 
+            width = request.GET.get("width")
+            width = int(width) if width is not None else None
+
             add_results = request.GET.get("add_results", True)
             if add_results:
                 # print("A", flush=True)
 
                 entries = []
                 for x in analyses:
-                    # print("B", flush=True)
-                    cache_path = os.path.join(settings.DATA_CACHE_ROOT, f"{x.id}.json")
-                    # print("C", flush=True)
-                    # print(cache_path, flush=True)
-                    cached = False
-                    try:
-                        if os.path.exists(cache_path):
-                            with open(cache_path, "r") as f:
-                                entries.append(json.load(f))
-                                cached = True
-                    except Exception:
-                        logger.exception(f"Cache couldn't read {e}")
-                    if cached:
+                    if width is not None and x.type in LOD_RESULT_TYPES:
+                        result_arrays = load_result_arrays(x, data_manager)
+                        if result_arrays is not None:
+                            data = slice_result_arrays(result_arrays, width=width)
+                            entries.append({**x.to_dict(), "data": data})
+                            continue
+                    cached = read_result(x.id)
+                    if cached is not None:
+                        entries.append(cached)
                         continue
                     # print(f"x {x}")
                     # TODO fix me
@@ -84,16 +94,76 @@ class PluginRunResultList(View):
                     with data:
                         result_dict = {**x.to_dict(), "data": data.to_dict()}
                         try:
-                            with open(cache_path, "w") as f:
-                                json.dump(result_dict, f)
+                            write_result(x.id, result_dict)
                         except Exception:
-                            logger.exception(f"Cache couldn't write {e}")
+                            logger.exception("Cache couldn't write")
 
                         entries.append(result_dict)
 
             else:
                 entries = [x.to_dict() for x in analyses]
-            return JsonResponse({"status": "ok", "entries": entries})
+            return data_response(request, {"status": "ok", "entries": entries})
         except Exception:
             logger.exception("Failed to list plugin run results")
             return JsonResponse({"status": "error"})
+
+
+class PluginRunResultSlice(View):
+    """
+    Returns the samples of a single scalar, histogram or rgb result inside a time
+    window, ?id=...&start=...&end=...&max_points=...&width=...
+    With the pixel width of the plot, scalar and histogram results are served from
+    the downsampled level that fits it.
+    """
+
+    def get(self, request):
+        if not request.user.is_authenticated:
+            logger.error("PluginRunResultSlice::not_authenticated")
+            return JsonResponse({"status": "error"})
+
+        try:
+            try:
+                result_db = PluginRunResult.objects.get(
+                    id=request.GET.get("id"),
+                    plugin_run__video__owner=request.user,
+                    plugin_run__deleted=False,
+                    plugin_run__video__deleted=False,
+                )
+            except (PluginRunResult.DoesNotExist, ValueError):
+                return JsonResponse({"status": "error", "type": "not_exist"})
+
+            try:
+                start = request.GET.get("start")
+                start = float(start) if start is not None else None
+                end = request.GET.get("end")
+                end = float(end) if end is not None else None
+                max_points = request.GET.get("max_points")
+                max_points = int(max_points) if max_points is not None else None
+                width = request.GET.get("width")
+                width = int(width) if width is not None else None
+            except ValueError:
+                return JsonResponse({"status": "error", "type": "wrong_request_body"})
+
+            result_arrays = load_result_arrays(result_db, DataManager("/predictions/"))
+            if result_arrays is None:
+                return JsonResponse({"status": "error", "type": "wrong_type"})
+
+            return data_response(
+                request,
+                {
+                    "status": "ok",
+                    "entry": {
+                        **result_db.to_dict(),
+                        "data": slice_result_arrays(
+                            result_arrays,
+                            start=start,
+                            end=end,
+                            max_points=max_points,
+                            width=width,
+                        ),
+                    },
+                },
+            )
+        except Exception:
+            logger.exception("Failed to slice plugin run result")
+            return JsonResponse({"status": "error"})
@@ -22,6 +22,10 @@ class TimelineList(View):
                 timelines = Timeline.objects.filter(video=video_db)
             else:
                 timelines = Timeline.objects.all()
+            # runs and videos marked as deleted wait for purge_deleted
+            timelines = timelines.filter(video__deleted=False).exclude(
+                plugin_run_result__plugin_run__deleted=True
+            )
             timelines = (
                 timelines.select_related("video")
                 .select_related("plugin_run_result")
@@ -48,7 +52,8 @@ class TimelineListAll(View):
             if not request.user.is_authenticated:
                 return JsonResponse({"status": "error"})
             
-            timelines = (Timeline.objects.filter(video__owner=request.user)
+            timelines = (Timeline.objects.filter(video__owner=request.user, video__deleted=False)
+                                         .exclude(plugin_run_result__plugin_run__deleted=True)
                                          .prefetch_related('plugin_run_result'))
             add_results_type = request.GET.get("add_results_type", False)
 
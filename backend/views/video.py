@@ -24,20 +24,26 @@ from backend.utils import (
 from django.views import View
 from django.http import JsonResponse
 from django.conf import settings
+from django.utils import timezone
 
 # from django.core.exceptions import BadRequest
 
-from backend.models import Video
+from backend.models import Video, PluginRun
+from backend.tasks.deletion import purge_deleted
+from backend.utils.media import create_uploaded_video
 
 
 logger = logging.getLogger(__name__)
 
 
 class VideoUpload(View):
-    def submit_analyse(self, plugins, **kwargs):
+    @staticmethod
+    def submit_analyse(plugins, video, user, **kwargs):
         plugin_manager = PluginManager()
-        for plugin in plugins:
-            plugin_manager(plugin, **kwargs)
+        plugins = [x for x in plugins if x in plugin_manager]
+        plugin_manager.submit_batch(
+            videos=[video], plugins=[{"plugin": x} for x in plugins], user=user, **kwargs
+        )
 
     def post(self, request):
         try:
@@ -72,30 +78,14 @@ class VideoUpload(View):
                 path = Path(request.FILES["file"].name)
                 ext = "".join(path.suffixes)
 
-                reader = imageio.get_reader(download_result["path"])
-                fps = reader.get_meta_data()["fps"]
-                duration = reader.get_meta_data()["duration"]
-                size = reader.get_meta_data()["size"]
-                meta = {
-                    "name": request.POST.get("title"),
-                    "width": size[0],
-                    "height": size[1],
-                    "ext": ext,
-                    "fps": fps,
-                    "duration": duration,
-                }
-                video_db, created = Video.objects.get_or_create(
-                    name=meta["name"],
-                    id=video_id_uuid,
-                    file=video_id_uuid,
-                    ext=meta["ext"],
-                    fps=meta["fps"],
-                    duration=meta["duration"],
-                    width=meta["width"],
-                    height=meta["height"],
-                    owner=request.user,
+                video_db = create_uploaded_video(
+                    download_result["path"],
+                    video_id_uuid,
+                    name=request.POST.get("title"),
+                    ext=ext,
+                    user=request.user,
                 )
-                if not created:
+                if video_db is None:
                     logger.error("VideoUpload::database_create_failed")
                     return JsonResponse(
                         {"status": "error", "type": "database_error"}, status=500
@@ -106,7 +96,7 @@ class VideoUpload(View):
                     plugins=["thumbnail"] + analyers, video=video_db, user=request.user
                 )
 
-                video_id_hex = video_db.id.hex if not video_db.file.hex else video_db.id.hex
+                video_id_hex = video_db.id.hex if not video_db.file else video_db.file.hex
                 return JsonResponse(
                     {
                         "status": "ok",
@@ -114,7 +104,7 @@ class VideoUpload(View):
                             {
                                 "id": video_id,
                                 **video_db.to_dict(),
-                                "url": media_url_to_video(video_id_hex, meta["ext"]),
+                                "url": media_url_to_video(video_id_hex, ext),
                             }
                         ],
                     }
@@ -221,10 +211,16 @@ class VideoDelete(View):
                 data = json.loads(body)
             except Exception as e:
                 return JsonResponse({"status": "error"}, status=500)
-            count, _ = Video.objects.filter(
-                id=data.get("id"), owner=request.user
-            ).delete()
+            # the video is hidden right away, its files are removed in the background
+            count = Video.objects.filter(id=data.get("id"), owner=request.user).update(
+                deleted=True
+            )
             if count:
+                # plugin/run/changes reports the runs of the video as deleted
+                PluginRun.objects.filter(
+                    video__id=data.get("id"), video__owner=request.user
+                ).update(update_date=timezone.now())
+                purge_deleted.delay()
                 return JsonResponse({"status": "ok"})
             return JsonResponse({"status": "error"}, status=500)
         except Exception:
@@ -0,0 +1,256 @@
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+from django.views import View
+from django.http import JsonResponse
+from django.conf import settings
+from django.core.cache import cache
+
+from backend.models import VideoUploadSession, VideoUploadChunk
+from backend.utils import check_extension, media_dir_to_video, media_path_to_video
+from backend.utils.media import create_uploaded_video
+from backend.tasks.video_upload import cleanup_video_uploads
+from .video import VideoUpload
+
+
+logger = logging.getLogger(__name__)
+
+
+VIDEO_EXTENSIONS = (".mkv", ".mp4", ".ogv")
+
+
+def parse_body(request):
+    try:
+        body = request.body.decode("utf-8")
+    except (UnicodeDecodeError, AttributeError):
+        body = request.body
+
+    try:
+        return json.loads(body)
+    except Exception:
+        return None
+
+
+def get_upload_session(request, upload_id):
+    try:
+        return VideoUploadSession.objects.get(id=upload_id, owner=request.user)
+    except (VideoUploadSession.DoesNotExist, ValueError):
+        return None
+
+
+class VideoUploadInit(View):
+    """
+    Starts a resumable upload. The client sends the file size up front, so files that
+    are too large are rejected before any data is transferred. The file is allocated
+    at full size and every chunk is written at its own offset.
+    """
+
+    def post(self, request):
+        try:
+            if not request.user.is_authenticated:
+                logger.error("VideoUploadInit::not_authenticated")
+                return JsonResponse(
+                    {"status": "error", "type": "not_authenticated"}, status=500
+                )
+
+            data = parse_body(request)
+            if data is None:
+                return JsonResponse({"status": "error"}, status=500)
+
+            if "filename" not in data or "size" not in data:
+                return JsonResponse(
+                    {"status": "error", "type": "missing_values"}, status=500
+                )
+
+            path = Path(data.get("filename"))
+            if not check_extension(path, VIDEO_EXTENSIONS):
+                return JsonResponse(
+                    {"status": "error", "type": "wrong_file_extension"}, status=500
+                )
+
+            size = int(data.get("size"))
+            max_size = request.user.max_video_size
+            if size <= 0 or (max_size is not None and size > max_size):
+                return JsonResponse(
+                    {"status": "error", "type": "file_too_large"}, status=500
+                )
+
+            upload_db = VideoUploadSession.objects.create(
+                owner=request.user,
+                name=data.get("title", path.stem),
+                ext="".join(path.suffixes),
+                size=size,
+                chunk_size=settings.VIDEO_UPLOAD_CHUNK_SIZE,
+                analyser=data.get("analyser", ""),
+            )
+
+            os.makedirs(media_dir_to_video(upload_db.id.hex), exist_ok=True)
+            with open(upload_db.path, "wb") as f:
+                f.truncate(size)
+
+            # also without celery beat abandoned uploads are removed once an hour
+            if cache.add("cleanup_video_uploads", True, timeout=60 * 60):
+                cleanup_video_uploads.delay()
+
+            return JsonResponse({"status": "ok", "entry": upload_db.to_dict()})
+        except Exception:
+            logger.exception("Failed to start video upload")
+            return JsonResponse({"status": "error"}, status=500)
+
+
+class VideoUploadChunkPut(View):
+    """
+    Receives one chunk as raw request body, ?upload_id=...&index=...&checksum=<sha256>.
+    Chunks can be sent in any order and in parallel, a chunk that is sent again
+    replaces the previous one.
+    """
+
+    def put(self, request):
+        try:
+            if not request.user.is_authenticated:
+                logger.error("VideoUploadChunkPut::not_authenticated")
+                return JsonResponse(
+                    {"status": "error", "type": "not_authenticated"}, status=500
+                )
+
+            upload_db = get_upload_session(request, request.GET.get("upload_id"))
+            if upload_db is None:
+                return JsonResponse({"status": "error", "type": "not_exist"}, status=500)
+
+            checksum = request.GET.get("checksum", request.headers.get("X-Checksum"))
+            if request.GET.get("index") is None or not checksum:
+                return JsonResponse(
+                    {"status": "error", "type": "missing_values"}, status=500
+                )
+
+            index = int(request.GET.get("index"))
+            if index < 0 or index >= upload_db.num_chunks:
+                return JsonResponse(
+                    {"status": "error", "type": "wrong_request_body"}, status=500
+                )
+
+            length = upload_db.chunk_length(index)
+            if int(request.META.get("CONTENT_LENGTH") or 0) != length:
+                return JsonResponse(
+                    {"status": "error", "type": "wrong_chunk_size"}, status=500
+                )
+
+            # a chunk counts as missing until it is written and verified again
+            VideoUploadChunk.objects.filter(session=upload_db, index=index).delete()
+
+            # the body is streamed to its place in the file instead of being buffered
+            h = hashlib.sha256()
+            offset = index * upload_db.chunk_size
+            received = 0
+            fd = os.open(upload_db.path, os.O_WRONLY)
+            try:
+                while received < length:
+                    block = request.read(min(1024 * 1024, length - received))
+                    if not block:
+                        break
+                    h.update(block)
+                    os.pwrite(fd, block, offset + received)
+                    received += len(block)
+            finally:
+                os.close(fd)
+
+            if received != length:
+                return JsonResponse(
+                    {"status": "error", "type": "wrong_chunk_size"}, status=500
+                )
+            if h.hexdigest() != checksum.lower():
+                return JsonResponse(
+                    {"status": "error", "type": "wrong_checksum"}, status=500
+                )
+
+            VideoUploadChunk.objects.update_or_create(
+                session=upload_db, index=index, defaults={"checksum": checksum.lower()}
+            )
+            return JsonResponse({"status": "ok", "index": index})
+        except Exception:
+            logger.exception("Failed to receive video upload chunk")
+            return JsonResponse({"status": "error"}, status=500)
+
+
+class VideoUploadStatus(View):
+    def get(self, request):
+        try:
+            if not request.user.is_authenticated:
+                return JsonResponse({"status": "error"}, status=500)
+
+            upload_db = get_upload_session(request, request.GET.get("upload_id"))
+            if upload_db is None:
+                return JsonResponse({"status": "error", "type": "not_exist"}, status=500)
+
+            return JsonResponse({"status": "ok", "entry": upload_db.to_dict()})
+        except Exception:
+            logger.exception("Failed to get video upload")
+            return JsonResponse({"status": "error"}, status=500)
+
+
+class VideoUploadComplete(View):
+    """
+    Finishes an upload once all chunks are received. The file already holds all chunks
+    at their offsets, so it is only renamed to the video path.
+    """
+
+    def post(self, request):
+        try:
+            if not request.user.is_authenticated:
+                logger.error("VideoUploadComplete::not_authenticated")
+                return JsonResponse(
+                    {"status": "error", "type": "not_authenticated"}, status=500
+                )
+
+            data = parse_body(request)
+            if data is None:
+                return JsonResponse({"status": "error"}, status=500)
+
+            upload_db = get_upload_session(request, data.get("upload_id"))
+            if upload_db is None:
+                return JsonResponse({"status": "error", "type": "not_exist"}, status=500)
+
+            received = set(upload_db.chunks.values_list("index", flat=True))
+            missing = [i for i in range(upload_db.num_chunks) if i not in received]
+            if missing:
+                return JsonResponse(
+                    {"status": "error", "type": "missing_chunks", "missing": missing},
+                    status=500,
+                )
+
+            video_id_uuid = upload_db.id
+            video_path = media_path_to_video(video_id_uuid.hex, upload_db.ext)
+            os.replace(upload_db.path, video_path)
+
+            try:
+                video_db = create_uploaded_video(
+                    video_path,
+                    video_id_uuid,
+                    name=upload_db.name,
+                    ext=upload_db.ext,
+                    user=request.user,
+                )
+            except Exception:
+                # the session keeps its file, so completing it can be retried
+                if os.path.exists(video_path):
+                    os.replace(video_path, upload_db.path)
+                raise
+            analyser = [x for x in upload_db.analyser.split(",") if x]
+            upload_db.delete()
+            if video_db is None:
+                logger.error("VideoUploadComplete::database_create_failed")
+                return JsonResponse(
+                    {"status": "error", "type": "database_error"}, status=500
+                )
+
+            VideoUpload.submit_analyse(
+                plugins=["thumbnail"] + analyser, video=video_db, user=request.user
+            )
+
+            return JsonResponse({"status": "ok", "entries": [video_db.to_dict()]})
+        except Exception:
+            logger.exception("Failed to complete video upload")
+            return JsonResponse({"status": "error"}, status=500)
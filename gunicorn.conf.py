@@ -0,0 +1,9 @@
+# gevent only switches between requests on blocking calls it knows about. psycopg2 is a
+# C extension, without the wait callback of psycogreen every query blocks the whole
+# worker including all other waiting requests.
+
+
+def post_fork(server, worker):
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
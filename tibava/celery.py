@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_process_shutdown
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tibava.settings")
@@ -20,3 +21,10 @@ app.autodiscover_tasks()
 @app.task(bind=True)
 def debug_task(self):
     print(f"Request: {self.request!r}")
+
+
+@worker_process_shutdown.connect
+def close_grpc_channels(**kwargs):
+    from backend.utils import channel_pool
+
+    channel_pool.close()
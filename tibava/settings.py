@@ -171,12 +171,72 @@ STATIC_URL = FORCE_SCRIPT_NAME + "/static/"
 
 MEDIA_ROOT = os.path.join("/media/")
 DATA_CACHE_ROOT = os.path.join("/cache/")
+# size of the result cache in DATA_CACHE_ROOT (bytes, None is unbounded) and how often
+# celery beat checks it (seconds)
+DATA_CACHE_MAX_SIZE = 20 * 1024 * 1024 * 1024
+DATA_CACHE_EVICT_INTERVAL = 60
+# threads that remove the files of deleted videos and plugin runs
+DELETION_WORKERS = 8
+# deleted runs are removed once their task had this long to notice the cancel (seconds)
+DELETION_GRACE_PERIOD = 60 * 10
 DATA_OUTPUT_PATH = os.path.join("/predictions")
 
 
 GRPC_HOST = "localhost"
 GRPC_PORT = 50051
 
+# chunk size of resumable video uploads (bytes)
+VIDEO_UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+# uploads without a new chunk for this long are removed with their file (seconds)
+VIDEO_UPLOAD_SESSION_TTL = 60 * 60 * 24
+
+# memoization of analyser stage outputs (seconds / number of entries)
+ANALYSER_RESULT_CACHE_TTL = 60 * 60 * 24 * 7
+ANALYSER_RESULT_CACHE_MAX_ENTRIES = 10000
+
+# concurrent downloads of the outputs of one analyser job and optional "gzip" or
+# "deflate" compression of the grpc messages
+ANALYSER_DOWNLOAD_WORKERS = 4
+ANALYSER_GRPC_COMPRESSION = None
+
+# plugin runs submit analyser jobs and return, a short task polls them (seconds)
+PLUGIN_RUN_BLOCKING = False
+PLUGIN_RUN_POLL_INTERVAL = 5
+PLUGIN_RUN_TIMEOUT = 60 * 60 * 24
+# progress updates of a plugin run within this window are written once (seconds)
+PLUGIN_RUN_PROGRESS_INTERVAL = 2
+# plugin/run/changes waits up to this long for changes, checking every interval (seconds)
+PLUGIN_RUN_CHANGES_TIMEOUT = 10
+PLUGIN_RUN_CHANGES_INTERVAL = 1
+# the returned cursor lags this long behind, for changes that commit late (seconds)
+PLUGIN_RUN_CHANGES_MARGIN = 30
+
+# plugin priority classes (0-9, higher runs first) and running plugins per user
+PLUGIN_RUN_DEFAULT_PRIORITY = 5
+PLUGIN_PRIORITIES = {
+    "thumbnail": 9,
+    "shotdetection": 8,
+    "face_clustering": 3,
+    "place_clustering": 3,
+    "whisper": 3,
+}
+PLUGIN_RUN_USER_CONCURRENCY = 4
+
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "queue_order_strategy": "priority",
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    "cleanup_video_uploads": {
+        "task": "backend.tasks.video_upload.cleanup_video_uploads",
+        "schedule": 60 * 60,
+    },
+}
+
+# declarative analyser pipelines, see backend/utils/pipeline.py
+PIPELINES = {}
+
 INDEXER_PATH = "/indexer"
 
 ANNOTATION_MAX_LENGTH = 1000
@@ -206,11 +266,31 @@ config_lut = {
     "static_url": "STATIC_URL",
     "media_root": "MEDIA_ROOT",
     "data_cache_root": "DATA_CACHE_ROOT",
+    "data_cache_max_size": "DATA_CACHE_MAX_SIZE",
+    "data_cache_evict_interval": "DATA_CACHE_EVICT_INTERVAL",
+    "deletion_workers": "DELETION_WORKERS",
+    "deletion_grace_period": "DELETION_GRACE_PERIOD",
     "upload_root": "UPLOAD_ROOT",
     "media_url": "MEDIA_URL",
     "upload_url": "UPLOAD_URL",
     "grpc_host": "GRPC_HOST",
     "grpc_port": "GRPC_PORT",
+    "video_upload_chunk_size": "VIDEO_UPLOAD_CHUNK_SIZE",
+    "video_upload_session_ttl": "VIDEO_UPLOAD_SESSION_TTL",
+    "analyser_result_cache_ttl": "ANALYSER_RESULT_CACHE_TTL",
+    "analyser_result_cache_max_entries": "ANALYSER_RESULT_CACHE_MAX_ENTRIES",
+    "analyser_download_workers": "ANALYSER_DOWNLOAD_WORKERS",
+    "analyser_grpc_compression": "ANALYSER_GRPC_COMPRESSION",
+    "plugin_run_blocking": "PLUGIN_RUN_BLOCKING",
+    "plugin_run_poll_interval": "PLUGIN_RUN_POLL_INTERVAL",
+    "plugin_run_timeout": "PLUGIN_RUN_TIMEOUT",
+    "plugin_run_progress_interval": "PLUGIN_RUN_PROGRESS_INTERVAL",
+    "plugin_run_changes_timeout": "PLUGIN_RUN_CHANGES_TIMEOUT",
+    "plugin_run_changes_interval": "PLUGIN_RUN_CHANGES_INTERVAL",
+    "plugin_run_changes_margin": "PLUGIN_RUN_CHANGES_MARGIN",
+    "plugin_run_default_priority": "PLUGIN_RUN_DEFAULT_PRIORITY",
+    "plugin_priorities": "PLUGIN_PRIORITIES",
+    "plugin_run_user_concurrency": "PLUGIN_RUN_USER_CONCURRENCY",
     "image_resolutions": "IMAGE_RESOLUTIONS",
     "pipelines": "PIPELINES",
 }
@@ -224,3 +304,9 @@ if config_path is not None and os.path.exists(config_path):
                 continue
             conf = {config_lut[k]: v}
             globals().update(conf)
+
+# after the config, so that data_cache_evict_interval applies
+CELERY_BEAT_SCHEDULE["evict_result_cache"] = {
+    "task": "backend.tasks.result_cache.evict_result_cache",
+    "schedule": DATA_CACHE_EVICT_INTERVAL,
+}